@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import time
+
+import numpy as np
+
+# Scaling benchmark for the RAG pipeline. Generate a corpus first, e.g.
+#   python setup_data.py --synthetic-docs 2000 --synthetic-questions 500
+# then measure it against the fake (deterministic, offline) Ollama server:
+#   python benchmark.py --corpus data/synthetic/corpus --questions data/synthetic/test_dataset.json
+#   python benchmark.py --compare old_results.json benchmark_results.json
+
+OUTPUT_FILE = "benchmark_results.json"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# metric -> True if higher is better
+METRIC_DIRECTIONS = {
+    "ingest_chunks_per_sec": True,
+    "ingest_mb_per_sec": True,
+    "index_bytes": False,
+    "peak_rss_mb": False,
+    "retrieval_p50_ms": False,
+    "retrieval_p95_ms": False,
+    "retrieval_p99_ms": False,
+    "e2e_p50_ms": False,
+    "e2e_p95_ms": False,
+    "e2e_p99_ms": False,
+    "hit_rate": True,
+}
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux; embedding workers are counted via RUSAGE_CHILDREN
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def percentiles(samples_s, prefix):
+    values = np.array(samples_s) * 1000
+    return {f"{prefix}_p{p}_ms": float(np.percentile(values, p)) for p in (50, 95, 99)}
+
+
+def run_benchmark(args):
+    from langchain.chains import RetrievalQA
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from langchain_community.llms import Ollama
+    from langchain_community.vectorstores import Chroma
+
+    from fake_ollama import start_server
+    from ingest import ingest
+    from main import generate_response
+
+    with open(args.questions, "r") as f:
+        questions = [q for q in json.load(f)["test_questions"] if q["answerable"]]
+    if args.max_questions:
+        questions = questions[:args.max_questions]
+
+    # 1. Ingest from scratch so throughput and index size are comparable between runs
+    print(f"[1/3] Ingesting {args.corpus}...")
+    if os.path.exists(args.persist_directory):
+        shutil.rmtree(args.persist_directory)
+    ingest_stats = ingest(args.corpus, "*.txt", args.persist_directory, args.chunk_size,
+                          args.chunk_overlap, batch_size=args.batch_size, workers=args.workers,
+                          resume=False, model_name=args.embedding_model)
+    index_bytes = directory_size(args.persist_directory)
+
+    embeddings = HuggingFaceEmbeddings(model_name=args.embedding_model)
+    db = Chroma(persist_directory=args.persist_directory, embedding_function=embeddings)
+
+    # 2. Retrieval latency (query embedding + vector search)
+    print(f"[2/3] Timing retrieval for {len(questions)} questions...")
+    retrieval_times = []
+    hits = 0
+    for item in questions:
+        start = time.perf_counter()
+        docs = db.similarity_search(item["question"], k=args.k)
+        retrieval_times.append(time.perf_counter() - start)
+        found = {os.path.basename(doc.metadata["source"]) for doc in docs}
+        hits += bool(found & set(item["source_documents"]))
+
+    # 3. End-to-end latency through the real chain against the deterministic LLM stand-in
+    print(f"[3/3] Timing end-to-end answers (LLM latency {args.llm_latency}s)...")
+    server, base_url = start_server(port=0, latency=args.llm_latency)
+    qa_chain = RetrievalQA.from_chain_type(
+        llm=Ollama(model="fake", base_url=base_url),
+        chain_type="stuff",
+        retriever=db.as_retriever(search_kwargs={"k": args.k})
+    )
+    e2e_times = []
+    for item in questions:
+        start = time.perf_counter()
+        docs = qa_chain.retriever.get_relevant_documents(item["question"])
+        generate_response(item["question"], docs, qa_chain.combine_documents_chain)
+        e2e_times.append(time.perf_counter() - start)
+    server.shutdown()
+
+    metrics = {
+        "chunks": ingest_stats["chunks"],
+        "ingest_chunks_per_sec": ingest_stats["chunks_per_sec"],
+        "ingest_mb_per_sec": ingest_stats["mb_per_sec"],
+        "index_bytes": index_bytes,
+        "peak_rss_mb": peak_rss_mb(),
+        "hit_rate": hits / len(questions) if questions else 0.0,
+        **percentiles(retrieval_times, "retrieval"),
+        **percentiles(e2e_times, "e2e"),
+    }
+    config = {key: value for key, value in vars(args).items() if key not in ("compare", "output")}
+    return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": config,
+            "questions": len(questions), "metrics": metrics}
+
+
+def compare(baseline_path, candidate_path, tolerance):
+    """Prints a metric-by-metric comparison; returns the number of regressions."""
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)["metrics"]
+    with open(candidate_path, "r") as f:
+        candidate = json.load(f)["metrics"]
+
+    regressions = 0
+    print(f"{'metric':<24}{'baseline':>14}{'candidate':>14}{'change':>10}")
+    for metric, higher_is_better in METRIC_DIRECTIONS.items():
+        if metric not in baseline or metric not in candidate:
+            continue
+        old, new = baseline[metric], candidate[metric]
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{metric:<24}{old:>14.2f}{new:>14.2f}{change:>+10.1%}{flag}")
+    print(f"\n{regressions} regression(s) beyond {tolerance:.0%} tolerance")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingest, index size, memory and latency.")
+    parser.add_argument("--corpus", default="data/synthetic/corpus")
+    parser.add_argument("--questions", default="data/synthetic/test_dataset.json")
+    parser.add_argument("--persist-directory", default="output/chroma_benchmark")
+    parser.add_argument("--chunk-size", type=int, default=550)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--embedding-model", default=EMBEDDING_MODEL)
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="Seconds the fake LLM waits before answering.")
+    parser.add_argument("--max-questions", type=int, default=0)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"),
+                        help="Compare two result files instead of running.")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Relative change counted as a regression (default 10%%).")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.tolerance) else 0)
+
+    report = run_benchmark(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+
+    for metric, value in report["metrics"].items():
+        print(f"  {metric:<24}{value:>14.2f}")
+    print(f"\nBenchmark complete! File saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
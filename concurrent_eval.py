@@ -0,0 +1,93 @@
+import asyncio
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class ConcurrentRunner:
+    """
+    Runs the retrieve -> generate pipeline for many questions at once.
+
+    Generation (the slow Ollama call) is bounded by `concurrency` slots that are
+    shared by every job passed to run_many(), so several chunk strategies can be
+    evaluated together without overloading the model server. Retrieval runs
+    under its own small limit and overlaps with generation of earlier questions.
+    Each generation attempt gets `timeout` seconds and is retried with
+    exponential backoff, except for exception types listed in `fatal_errors`.
+    An attempt that timed out still holds its slot until its thread returns.
+    """
+
+    def __init__(self, concurrency=4, timeout=120.0, retries=2, backoff=1.0, retrieval_workers=1,
+                 fatal_errors=()):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.retrieval_workers = retrieval_workers
+        self.fatal_errors = tuple(fatal_errors)
+
+    def run_many(self, jobs):
+        """
+        jobs: list of (items, retrieve, generate) where retrieve(item) -> docs and
+        generate(item, docs) -> answer. Returns, per job, a list aligned with
+        `items` holding (docs, answer) or the exception that ended that item.
+        """
+        return asyncio.run(self._run_many(jobs))
+
+    async def _run_many(self, jobs):
+        # Not the loop's default executor: asyncio.run() would then wait at shutdown for
+        # calls that timed out and are still running
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency + self.retrieval_workers)
+        self._generation_slots = asyncio.Semaphore(self.concurrency)
+        self._retrieval_slots = asyncio.Semaphore(self.retrieval_workers)
+        try:
+            return await asyncio.gather(*(self._run_job(*job) for job in jobs))
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_job(self, items, retrieve, generate):
+        # gather() keeps results in question order regardless of completion order
+        return await asyncio.gather(
+            *(self._run_item(item, retrieve, generate) for item in items),
+            return_exceptions=True,
+        )
+
+    async def _run_item(self, item, retrieve, generate):
+        async with self._retrieval_slots:
+            docs = await self._in_thread(retrieve, item)
+        answer = await self._call_with_retries(generate, item, docs)
+        return docs, answer
+
+    async def _call_with_retries(self, fn, *args):
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._attempt(fn, *args)
+            except self.fatal_errors:
+                raise
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                # Exponential backoff with a little jitter so retries don't arrive in lockstep
+                await asyncio.sleep(self.backoff * (2 ** attempt) * random.uniform(1.0, 1.25))
+
+    async def _attempt(self, fn, *args):
+        # A thread can't be interrupted, so a call that timed out keeps its generation slot
+        # until it really returns: retries never push the model server past `concurrency`
+        await self._generation_slots.acquire()
+        call = self._in_thread(fn, *args)
+        call.add_done_callback(self._release_slot)
+        return await asyncio.wait_for(asyncio.shield(call), self.timeout)
+
+    def _release_slot(self, call):
+        self._generation_slots.release()
+        if not call.cancelled():
+            call.exception()  # an abandoned call's error has nobody left to read it
+
+    def _in_thread(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args))
+
+
+def http_timeout(seconds):
+    """Ollama's client takes whole seconds (0 is rejected); the runner enforces the exact limit."""
+    return max(1, math.ceil(seconds))
@@ -0,0 +1,97 @@
+import re
+
+from langchain_core.documents import Document
+
+# Mistral averages roughly 4 characters per token on English prose; good enough for budgeting
+CHARS_PER_TOKEN = 4
+MIN_OVERLAP_CHARS = 20      # shorter shared spans are treated as coincidence, not splitter overlap
+MIN_DEDUP_SENTENCE_CHARS = 20
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def merge_overlapping(first, second, min_overlap=MIN_OVERLAP_CHARS):
+    """
+    Joins two chunks of the same document if one contains the other or the end
+    of one repeats the start of the other (splitter overlap). Returns None otherwise.
+    """
+    if second in first:
+        return first
+    if first in second:
+        return second
+    for a, b in ((first, second), (second, first)):
+        # Candidate overlap starts wherever b's opening appears in a
+        probe = b[:min_overlap]
+        start = a.find(probe)
+        while start != -1:
+            if b.startswith(a[start:]):
+                return a + b[len(a) - start:]
+            start = a.find(probe, start + 1)
+    return None
+
+
+def pack_context(docs, token_budget=1500):
+    """
+    Turns retrieved chunks into a compact context for the "stuff" prompt:
+      1. merges overlapping/adjacent chunks from the same source,
+      2. drops sentences already present in a higher-ranked chunk,
+      3. keeps chunks in retrieval order until the token budget is spent.
+    Returns (packed_docs, stats) where stats compares tokens before and after.
+    """
+    # 1. Merge per source, keeping the rank of the best chunk in each group
+    groups = []
+    for doc in docs:
+        source = doc.metadata.get("source")
+        for group in groups:
+            if group["source"] != source:
+                continue
+            merged = merge_overlapping(group["text"], doc.page_content)
+            if merged is not None:
+                group["text"] = merged
+                group["chunks"] += 1
+                break
+        else:
+            groups.append({"source": source, "text": doc.page_content,
+                           "metadata": dict(doc.metadata), "chunks": 1})
+
+    # 2. Remove sentences the prompt already contains
+    seen = set()
+    for group in groups:
+        kept = []
+        for sentence in SENTENCE_BOUNDARY.split(group["text"]):
+            key = NON_WORD.sub(" ", sentence.lower()).strip()
+            if len(key) >= MIN_DEDUP_SENTENCE_CHARS and key in seen:
+                continue
+            seen.add(key)
+            kept.append(sentence)
+        group["text"] = " ".join(kept)
+
+    # 3. Fill the budget in rank order; the top chunk is truncated rather than dropped
+    packed = []
+    used = 0
+    for group in groups:
+        tokens = estimate_tokens(group["text"])
+        if used + tokens > token_budget:
+            if packed:
+                continue
+            group["text"] = group["text"][:token_budget * CHARS_PER_TOKEN]
+            tokens = estimate_tokens(group["text"])
+        used += tokens
+        metadata = group["metadata"]
+        metadata["merged_chunks"] = group["chunks"]
+        packed.append(Document(page_content=group["text"], metadata=metadata))
+
+    raw_tokens = sum(estimate_tokens(doc.page_content) for doc in docs)
+    stats = {
+        "context_tokens": raw_tokens,
+        "packed_context_tokens": used,
+        "prompt_tokens_saved": raw_tokens - used,
+        "chunks_in": len(docs),
+        "chunks_out": len(packed),
+    }
+    return packed, stats
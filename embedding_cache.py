@@ -0,0 +1,201 @@
+import hashlib
+import heapq
+import json
+import os
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+INDEX_FILE = "index.json"
+VECTORS_FILE = "vectors.f32"
+INITIAL_CAPACITY = 1024
+EVICTION_FRACTION = 100     # a full cache frees 1/100 of its rows at once
+
+
+def cache_directory(root, model_name):
+    """Per-model cache directory: one vector matrix can only hold one dimension."""
+    return os.path.join(root, model_name.replace("/", "__"))
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (model name, text hash).
+
+    Vectors live in one memory-mapped float32 matrix (row per entry); index.json
+    maps key -> [row, last_used]. Once max_entries is reached the least recently
+    used rows are recycled. A directory stores one vector size; keep one
+    directory per model.
+    """
+
+    def __init__(self, directory, max_entries=100_000):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._dirty = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, INDEX_FILE)
+        self._vectors_path = os.path.join(directory, VECTORS_FILE)
+
+        if os.path.exists(self._index_path):
+            with open(self._index_path, "r") as f:
+                state = json.load(f)
+        else:
+            state = {"dim": None, "capacity": 0, "clock": 0, "entries": {}}
+
+        self.dim = state["dim"]
+        self._capacity = state["capacity"]
+        self._clock = state["clock"]
+        self._entries = state["entries"]
+        used = {row for row, _ in self._entries.values()}
+        self._free_rows = [row for row in range(self._capacity) if row not in used]
+
+        if self.dim is not None and self._capacity:
+            self._open_matrix()
+
+    @staticmethod
+    def key(model_name, text):
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_many(self, keys):
+        """Returns a list aligned with `keys`: a float32 vector or None on a miss."""
+        with self._lock:
+            results = []
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self.hits += 1
+                self._clock += 1
+                entry[1] = self._clock
+                self._dirty = True
+                results.append(np.array(self._matrix[entry[0]]))
+            return results
+
+    def put_many(self, keys, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"{self.directory} holds {self.dim}-dim vectors but got {vectors.shape[1]}-dim ones; "
+                    f"use a separate cache directory per embedding model (see cache_directory())"
+                )
+
+            new_keys = [key for key in dict.fromkeys(keys) if key not in self._entries]
+            self._make_room(len(new_keys))
+
+            rows_by_key = {}
+            for key in new_keys:
+                if not self._free_rows:
+                    break  # more new keys than max_entries; keep the first ones
+                rows_by_key[key] = self._free_rows.pop()
+
+            for key, vector in zip(keys, vectors):
+                row = rows_by_key.get(key)
+                if row is None:
+                    continue
+                self._matrix[row] = vector
+                self._clock += 1
+                self._entries[key] = [row, self._clock]
+            self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            if self._matrix is not None:
+                self._matrix.flush()
+            state = {
+                "dim": self.dim,
+                "capacity": self._capacity,
+                "clock": self._clock,
+                "entries": self._entries,
+            }
+            tmp_path = self._index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self._index_path)
+            self._dirty = False
+
+    def _make_room(self, needed):
+        # 1. Evict LRU entries if we would go over the cap
+        overflow = len(self._entries) + needed - self.max_entries
+        if overflow > 0:
+            # Evict a slice at a time so a full cache doesn't rescan every entry on each miss
+            overflow = min(max(overflow, self.max_entries // EVICTION_FRACTION), len(self._entries))
+            oldest = heapq.nsmallest(overflow, self._entries.items(), key=lambda item: item[1][1])
+            for key, (row, _) in oldest:
+                del self._entries[key]
+                self._free_rows.append(row)
+
+        # 2. Grow the matrix (doubling, capped at max_entries) if there still aren't enough rows
+        if len(self._free_rows) < needed and self._capacity < self.max_entries:
+            new_capacity = max(self._capacity, INITIAL_CAPACITY)
+            while new_capacity - len(self._entries) < needed and new_capacity < self.max_entries:
+                new_capacity *= 2
+            new_capacity = min(new_capacity, self.max_entries)
+            self._resize(new_capacity)
+
+    def _resize(self, new_capacity):
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._free_rows.extend(range(self._capacity, new_capacity))
+        self._capacity = new_capacity
+        self._open_matrix()
+
+    def _open_matrix(self):
+        self._matrix = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.dim)
+        )
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Drop-in wrapper for any LangChain embedding model: only texts missing
+    from the cache reach the underlying model. New vectors are written to
+    disk by cache.flush(), which the caller runs once at the end.
+    """
+
+    def __init__(self, underlying, cache, model_name):
+        self.underlying = underlying
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts):
+        return self._embed(texts, self.model_name, self.underlying.embed_documents)
+
+    def embed_query(self, text):
+        # Some models embed queries differently, so they get their own key space
+        return self._embed([text], f"{self.model_name}:query",
+                           lambda batch: [self.underlying.embed_query(batch[0])])[0]
+
+    def _embed(self, texts, namespace, embed_fn):
+        keys = [EmbeddingCache.key(namespace, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once, in a single batched call
+        missing = {}
+        for i, (key, vector) in enumerate(zip(keys, vectors)):
+            if vector is None:
+                missing.setdefault(key, i)
+        if missing:
+            fresh = embed_fn([texts[i] for i in missing.values()])
+            self.cache.put_many(list(missing), fresh)
+            by_key = dict(zip(missing, fresh))
+            vectors = [by_key[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+
+        return [np.asarray(vector, dtype=np.float32).tolist() for vector in vectors]
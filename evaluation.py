@@ -1,24 +1,40 @@
-import os
 import json
-import shutil
+import time
+import argparse
+import atexit
+from functools import partial
+from itertools import product
 import numpy as np
 import nltk
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-from rouge_score import rouge_scorer
-from sklearn.metrics.pairwise import cosine_similarity
 from langchain_community.document_loaders import DirectoryLoader, TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain_community.llms import Ollama
 from langchain.chains import RetrievalQA
+from langchain.globals import set_llm_cache
+
+from concurrent_eval import ConcurrentRunner, http_timeout
+from embedding_cache import EmbeddingCache, CachedEmbeddings, cache_directory
+from hybrid_search import HybridRetriever, sync_bm25_index
+from ingestion import sync_vector_store
+from scoring import score_batch
+from single_pass_eval import run_single_pass
+from streaming import StreamingTimer
+from llm_cache import CACHE_MODES, CacheMissError, ResponseCache, llm_identity
+from main import generate_response
 
 # --- Configuration ---
 CORPUS_PATH = "data/corpus"
 TEST_DATA_PATH = "test_dataset.json"
 OUTPUT_FILE = "test_results.json"
 MODEL_NAME = "mistral"
+OLLAMA_URL = "http://localhost:11434"
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_CACHE_PATH = "output/embedding_cache"
+EMBEDDING_CACHE_MAX_ENTRIES = 100_000
+CHUNK_OVERLAP = 100
+LLM_CACHE_PATH = "output/llm_cache.sqlite"
+CONTEXT_TOKEN_BUDGET = 1500
 
 # Silent NLTK download
 print("Downloading NLTK data...")
@@ -30,50 +46,10 @@ def load_test_data():
         data = json.load(f)
         return data['test_questions']
 
-def calculate_retrieval_metrics(retrieved_docs, true_filenames):
-    hits = 0
-    reciprocal_rank = 0
-    
-    retrieved_filenames = [os.path.basename(doc.metadata['source']) for doc in retrieved_docs]
-    
-    # HIT RATE: Did we find the right document?
-    if any(f in true_filenames for f in retrieved_filenames):
-        hits = 1
-    
-    # MRR: How high up was the right document?
-    for i, fname in enumerate(retrieved_filenames):
-        if fname in true_filenames:
-            reciprocal_rank = 1 / (i + 1)
-            break
-            
-    return hits, reciprocal_rank
-
-def calculate_text_metrics(generated_answer, ground_truth, embedding_model):
-    # ROUGE (Overlap)
-    scorer = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True)
-    scores = scorer.score(ground_truth, generated_answer)
-    rouge_l = scores['rougeL'].fmeasure
-
-    # BLEU (Translation Quality)
-    try:
-        reference = [nltk.word_tokenize(ground_truth.lower())]
-        candidate = nltk.word_tokenize(generated_answer.lower())
-        bleu = sentence_bleu(reference, candidate, smoothing_function=SmoothingFunction().method1)
-    except:
-        bleu = 0.0
-
-    # COSINE SIMILARITY (Meaning)
-    embeddings = embedding_model.embed_documents([generated_answer, ground_truth])
-    similarity = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
-
-    return rouge_l, bleu, similarity
-
-def run_evaluation_for_chunk_size(chunk_size, questions, embedding_model):
-    print(f"\n---  Testing Chunk Strategy: {chunk_size} chars ---")
+def build_qa_chain(chunk_size, embedding_model, llm, retrieval="vector"):
+    print(f"\n---  Preparing Chunk Strategy: {chunk_size} chars ({retrieval}) ---")
     
     db_path = f"output/chroma_{chunk_size}"
-    if os.path.exists(db_path):
-        shutil.rmtree(db_path)
 
     # 1. Split Documents (Increased overlap to prevent cut-off sentences)
     loader = DirectoryLoader(CORPUS_PATH, glob="*.txt", loader_cls=TextLoader)
@@ -82,71 +58,242 @@ def run_evaluation_for_chunk_size(chunk_size, questions, embedding_model):
     # OPTIMIZATION 1: Increase overlap to 100 to save small chunks like Q22
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size, 
-        chunk_overlap=100
+        chunk_overlap=CHUNK_OVERLAP
     )
     texts = text_splitter.split_documents(documents)
     
-    # 2. Embed & Store
-    db = Chroma.from_documents(texts, embedding_model, persist_directory=db_path)
+    # 2. Embed & Store (incremental: unchanged chunks are neither deleted nor re-embedded)
+    db, sync_stats = sync_vector_store(texts, embedding_model, db_path, chunk_size, CHUNK_OVERLAP)
+    print(f"  Index: {sync_stats['added']} added, {sync_stats['removed']} removed, "
+          f"{sync_stats['unchanged']} unchanged")
     
     # OPTIMIZATION 2: Increase k to 5 (Top-5 retrieval ensures we find the doc)
-    retriever = db.as_retriever(search_kwargs={"k": 5})
+    if retrieval == "hybrid":
+        # BM25 index lives next to the Chroma store and is only touched when the chunks change
+        bm25, (added, removed) = sync_bm25_index(db_path, sync_stats['chunks'], sync_stats['fingerprint'])
+        print(f"  BM25: {len(bm25)} chunks ({added} added, {removed} removed)")
+        retriever = HybridRetriever(vectorstore=db, bm25=bm25, k=5)
+    else:
+        retriever = db.as_retriever(search_kwargs={"k": 5})
     
     # 3. Setup Chain
-    llm = Ollama(model=MODEL_NAME)
-    qa_chain = RetrievalQA.from_chain_type(
+    return RetrievalQA.from_chain_type(
         llm=llm, 
         chain_type="stuff", 
         retriever=retriever, 
         return_source_documents=True
     )
+
+# The two halves of qa_chain.invoke, split so the runner can overlap retrieval with generation.
+# Each generation attempt gets its own StreamingTimer (same timings as main.py): a retry must not
+# share one with an attempt that timed out but is still streaming tokens.
+def retrieve_context(qa_chain, item):
+    timer = StreamingTimer()
+    with timer.retrieval():
+        docs = qa_chain.retriever.get_relevant_documents(item['question'])
+    return {"docs": docs, "retrieval_s": timer.retrieval_time}
+
+def generate_answer(qa_chain, item, retrieved, token_budget=CONTEXT_TOKEN_BUDGET):
+    # Retrieval metrics are scored on the raw chunks; the LLM only sees the packed context
+    timer = StreamingTimer()
+    timer.retrieval_time = retrieved['retrieval_s']
+    response, packing = generate_response(item['question'], retrieved['docs'],
+                                          qa_chain.combine_documents_chain, timer, token_budget)
+    return response['result'], timer.timings(), packing
+
+def score_strategy(chunk_size, retrieval, items, outcomes, embedding_model, processes=0, label=None):
+    label = label or f"{chunk_size} chars ({retrieval})"
+    print(f"\n---  Testing Chunk Strategy: {label} ---")
     
-    results = []
-    
-    # 4. Run Questions
-    for item in questions:
-        if not item['answerable']:
+    # outcomes are in question order: (retrieved, (answer, timing, packing)) or the exception
+    # that stopped that question
+    answered = []
+    for item, outcome in zip(items, outcomes):
+        if isinstance(outcome, BaseException):
+            print(f"  [Error Q{item['id']}]: {outcome!r}")
             continue
+        retrieved, (answer, timing, packing) = outcome
+        answered.append((item, retrieved, answer, (timing, packing)))
 
-        try:
-            response = qa_chain.invoke({"query": item['question']})
-            hits, mrr = calculate_retrieval_metrics(response['source_documents'], item['source_documents'])
-            rouge, bleu, cos = calculate_text_metrics(response['result'], item['ground_truth'], embedding_model)
-            
-            results.append({
-                "question_id": item['id'],
-                "hit_rate": hits,
-                "mrr": mrr,
-                "rouge_l": rouge,
-                "cosine_sim": cos
-            })
-            print(f"  [Q{item['id']}] Hit: {hits} | Cosine: {cos:.2f}")
-            
-        except Exception as e:
-            print(f"  [Error Q{item['id']}]: {e}")
+    # Every answered question of this strategy is scored in one batch
+    scores = score_batch(
+        [answer for _, _, answer, _ in answered],
+        [item['ground_truth'] for item, _, _, _ in answered],
+        embedding_model,
+        retrieved_docs=[retrieved['docs'] for _, retrieved, _, _ in answered],
+        true_sources=[item['source_documents'] for item, _, _, _ in answered],
+        processes=processes
+    )
+
+    results = []
+    for i, (item, retrieved, _, (timing, packing)) in enumerate(answered):
+        results.append({
+            "question_id": item['id'],
+            "hit_rate": scores['hit_rate'][i],
+            "mrr": scores['mrr'][i],
+            "rouge_l": scores['rouge_l'][i],
+            "bleu": scores['bleu'][i],
+            "cosine_sim": scores['cosine_sim'][i],
+            "timing": timing,
+            "packing": packing
+        })
+        print(f"  [Q{item['id']}] Hit: {scores['hit_rate'][i]} | Cosine: {scores['cosine_sim'][i]:.2f}")
 
     avg_hit = np.mean([r['hit_rate'] for r in results])
-    print(f" Result for {chunk_size}: Avg Hit Rate={avg_hit:.2f}")
+    avg_mrr = np.mean([r['mrr'] for r in results])
+    print(f" Result for {label}: Avg Hit Rate={avg_hit:.2f} | Avg MRR={avg_mrr:.2f}")
+    saved = [r['packing']['prompt_tokens_saved'] for r in results if r['packing']]
+    if saved:
+        print(f" Context packing saved {np.mean(saved):.0f} prompt tokens per query on average")
     
-    return {"chunk_size": chunk_size, "avg_hit_rate": avg_hit, "detailed_results": results}
+    return {"chunk_size": chunk_size, "retrieval": retrieval, "avg_hit_rate": avg_hit,
+            "avg_mrr": avg_mrr, "detailed_results": results}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate AmbedkarGPT across chunking strategies.")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Max simultaneous LLM calls, shared across all strategies (default: 1).")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds per LLM call attempt.")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per question after a failed call.")
+    parser.add_argument("--backoff", type=float, default=1.0, help="Base backoff in seconds between retries.")
+    parser.add_argument("--ollama-url", default=OLLAMA_URL,
+                        help="Ollama server URL (point at fake_ollama.py for offline runs).")
+    parser.add_argument("--llm-cache", choices=CACHE_MODES, default="record",
+                        help="record: reuse stored answers and store new ones; replay: stored answers only, "
+                             "fail on a miss (no Ollama needed); passthrough: always call the model.")
+    parser.add_argument("--llm-cache-path", default=LLM_CACHE_PATH)
+    parser.add_argument("--context-budget", type=int, default=CONTEXT_TOKEN_BUDGET,
+                        help="Token budget for the packed context (0 disables packing).")
+    parser.add_argument("--scoring-processes", type=int, default=0,
+                        help="Processes for ROUGE/BLEU scoring (0 scores in this process).")
+    parser.add_argument("--hybrid", action="store_true",
+                        help="Also run every chunk size with hybrid BM25 + vector retrieval.")
+    parser.add_argument("--single-pass", action="store_true",
+                        help="Load/split/embed the corpus once and evaluate every strategy from shared "
+                             "in-memory matrices (vector retrieval only).")
+    parser.add_argument("--chunk-sizes", default="250,550,900", help="Comma-separated chunk sizes.")
+    parser.add_argument("--overlaps", default=str(CHUNK_OVERLAP),
+                        help="Comma-separated chunk overlaps (--single-pass sweeps).")
+    parser.add_argument("--ks", default="5", help="Comma-separated retrieval depths (--single-pass sweeps).")
+    parser.add_argument("--strategy-workers", type=int, default=1,
+                        help="Worker processes running strategies in parallel (--single-pass); "
+                             "--concurrency is split between them.")
+    args = parser.parse_args(argv)
+    if args.single_pass and args.hybrid:
+        parser.error("--hybrid is not supported with --single-pass (it only evaluates vector retrieval)")
+    return args
+
+def parse_int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
 
-def main():
-    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+def run_single_pass_mode(args, items, embeddings, llm_cache):
+    """
+    Every (chunk size, overlap, k) combination from one corpus load and one
+    embedding pass. Returns the strategy entries for test_results.json.
+    """
+    strategies = list(product(parse_int_list(args.chunk_sizes), parse_int_list(args.overlaps),
+                              parse_int_list(args.ks)))
+    config = {
+        "model": MODEL_NAME, "ollama_url": args.ollama_url, "timeout": args.timeout,
+        "concurrency": args.concurrency, "retries": args.retries, "backoff": args.backoff,
+        "context_budget": args.context_budget,
+        "llm_cache_path": args.llm_cache_path, "llm_cache_mode": args.llm_cache,
+        "llm_cache_namespace": llm_cache.namespace,
+    }
+    print(f"\nSingle pass: {len(items)} questions x {len(strategies)} strategies "
+          f"(concurrency={args.concurrency} in total)...")
+    runs, shared_costs = run_single_pass(CORPUS_PATH, items, embeddings, strategies, config,
+                                         workers=args.strategy_workers)
+
+    entries = []
+    for (size, overlap, k), outcomes, cost in runs:
+        start = time.perf_counter()
+        entry = score_strategy(size, "vector", items, outcomes, embeddings,
+                               processes=args.scoring_processes,
+                               label=f"{size} chars, overlap {overlap}, k={k}")
+        cost["scoring_s"] = time.perf_counter() - start
+        entry.update({"chunk_overlap": overlap, "k": k, "cost": cost})
+        entries.append(entry)
+
+    # Per-strategy cost breakdown; load and question embedding are paid once for all strategies
+    print(f"\n--- Cost breakdown (shared: load {shared_costs['load_s']:.2f}s, "
+          f"question embedding {shared_costs['query_embed_s']:.2f}s) ---")
+    print(f"{'strategy':<20}{'split':>8}{'embed':>8}{'retrieve':>10}{'generate':>10}{'score':>8}{'llm hits':>10}")
+    for entry in entries:
+        cost = entry['cost']
+        name = f"{entry['chunk_size']}/{entry['chunk_overlap']}/k{entry['k']}"
+        print(f"{name:<20}{cost['split_s']:>8.2f}{cost['embed_s']:>8.2f}{cost['retrieval_s']:>10.3f}"
+              f"{cost['generation_s']:>10.2f}{cost['scoring_s']:>8.2f}"
+              f"{cost['llm_cache_hits']:>5}/{cost['llm_cache_hits'] + cost['llm_cache_misses']:<4}")
+    return entries
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Shared by vector-store building and metric scoring, persisted across runs
+    embedding_cache = EmbeddingCache(cache_directory(EMBEDDING_CACHE_PATH, EMBEDDING_MODEL),
+                                     max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+    embeddings = CachedEmbeddings(
+        HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL), embedding_cache, EMBEDDING_MODEL
+    )
+    # Flushing once instead of per miss; atexit keeps the vectors if a later step fails
+    atexit.register(embedding_cache.flush)
     questions = load_test_data()
+    items = [item for item in questions if item['answerable']]
     
     # Strategies required by Assignment-2 PDF (Source: 27-29)
-    strategies = [250, 550, 900] 
+    chunk_sizes = parse_int_list(args.chunk_sizes)
+    strategies = [(size, "vector") for size in chunk_sizes]
+    if args.hybrid:
+        strategies += [(size, "hybrid") for size in chunk_sizes]
     
     final_report = {"model": MODEL_NAME, "strategies": []}
-    
-    for size in strategies:
-        strategy_result = run_evaluation_for_chunk_size(size, questions, embeddings)
+
+    # One client for every strategy; it holds no per-request state
+    llm = Ollama(model=MODEL_NAME, base_url=args.ollama_url, timeout=http_timeout(args.timeout))
+
+    # Keyed by (server, model, generation params, rendered prompt), so reruns skip unchanged prompts
+    llm_cache = ResponseCache(args.llm_cache_path, mode=args.llm_cache, namespace=llm_identity(llm))
+    set_llm_cache(llm_cache)
+
+    if args.single_pass:
+        final_report["strategies"] = run_single_pass_mode(args, items, embeddings, llm_cache)
+        with open(OUTPUT_FILE, 'w') as f:
+            json.dump(final_report, f, indent=4)
+        embedding_cache.flush()
+        print(f"\n Evaluation Complete! File saved to {OUTPUT_FILE}")
+        return
+
+    chains = [build_qa_chain(size, embeddings, llm, retrieval) for size, retrieval in strategies]
+
+    # All strategies run together; --concurrency bounds the total load on Ollama
+    runner = ConcurrentRunner(
+        concurrency=args.concurrency, timeout=args.timeout, retries=args.retries, backoff=args.backoff,
+        fatal_errors=(CacheMissError,)
+    )
+    print(f"\nRunning {len(items)} questions x {len(strategies)} strategies "
+          f"(concurrency={args.concurrency})...")
+    start_time = time.time()
+    outcomes = runner.run_many([
+        (items, partial(retrieve_context, chain),
+         partial(generate_answer, chain, token_budget=args.context_budget))
+        for chain in chains
+    ])
+    print(f"Generation finished in {time.time() - start_time:.2f}s")
+    print(llm_cache.stats())
+
+    for (size, retrieval), strategy_outcomes in zip(strategies, outcomes):
+        strategy_result = score_strategy(size, retrieval, items, strategy_outcomes, embeddings,
+                                         processes=args.scoring_processes)
         final_report["strategies"].append(strategy_result)
         
     with open(OUTPUT_FILE, 'w') as f:
         json.dump(final_report, f, indent=4)
+
+    embedding_cache.flush()
+    print(f"\n Embedding cache: {embedding_cache.hits} hits, {embedding_cache.misses} misses")
         
     print(f"\n Evaluation Complete! File saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
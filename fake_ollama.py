@@ -0,0 +1,122 @@
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stand-in for `ollama serve` so the evaluation harness can be tested and
+# benchmarked offline. Speaks the streaming /api/generate protocol that
+# LangChain's Ollama client uses and answers deterministically with the
+# first sentence of the context it was given.
+
+DEFAULT_PORT = 11435
+
+
+def fake_answer(prompt):
+    # The "stuff" prompt puts the retrieved context between the instructions and "Question:"
+    context = prompt.split("\n\n", 1)[-1].split("\n\nQuestion:", 1)[0].strip()
+    sentences = re.split(r"(?<=[.!?])\s+", context)
+    return sentences[0] if sentences and sentences[0] else "I don't know."
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    latency = 1.0       # seconds before the first token (prompt processing)
+    token_delay = 0.0   # seconds between streamed tokens
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/api/generate":
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        model = payload.get("model", "fake")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        time.sleep(self.latency)
+        tokens = re.findall(r"\S+\s*", fake_answer(payload.get("prompt", "")))
+        for token in tokens:
+            self._write_line({"model": model, "created_at": _now(), "response": token, "done": False})
+            time.sleep(self.token_delay)
+        self._write_line({"model": model, "created_at": _now(), "response": "", "done": True,
+                          "eval_count": len(tokens)})
+
+    def _write_line(self, obj):
+        self.wfile.write((json.dumps(obj) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output readable
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def start_server(port=DEFAULT_PORT, latency=1.0, token_delay=0.0):
+    """Starts the fake server on a background thread. Returns (server, base_url)."""
+    handler = type("ConfiguredHandler", (FakeOllamaHandler,),
+                   {"latency": latency, "token_delay": token_delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run_benchmark(latency, questions, concurrency):
+    from langchain_community.llms import Ollama
+    from concurrent_eval import ConcurrentRunner
+
+    server, base_url = start_server(port=0, latency=latency)
+    llm = Ollama(model="fake", base_url=base_url)
+    items = [f"Context sentence number {i}. More text.\n\nQuestion: q{i}" for i in range(questions)]
+
+    def retrieve(item):
+        return []
+
+    def generate(item, docs):
+        return llm.invoke(f"Instructions\n\n{item}")
+
+    timings = {}
+    for label, workers in [("sequential", 1), (f"concurrency={concurrency}", concurrency)]:
+        start = time.time()
+        ConcurrentRunner(concurrency=workers).run_many([(items, retrieve, generate)])
+        timings[label] = time.time() - start
+        print(f"{label:>16}: {timings[label]:.2f}s for {questions} questions")
+
+    sequential, concurrent = timings.values()
+    print(f"{'speedup':>16}: {sequential / concurrent:.1f}x")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for offline evaluation runs.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds before the first token.")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between tokens.")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Compare sequential vs concurrent execution against an in-process server.")
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark(args.latency, args.questions, args.concurrency)
+        return
+
+    server, base_url = start_server(args.port, args.latency, args.token_delay)
+    print(f"Fake Ollama listening on {base_url} (latency={args.latency}s)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
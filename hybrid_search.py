@@ -0,0 +1,205 @@
+import math
+import os
+import pickle
+import re
+from array import array
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+BM25_INDEX_FILE = "bm25_index.pkl"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have he in is it its of on or that the this "
+    "to was were will with what which who why how does do did".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk texts, keyed by the chunk IDs from ingestion.py.
+
+    Postings are term -> (doc ids, term frequencies) held in compact
+    array('I') buffers, which NumPy reads without copying at query time.
+    Removing a chunk only tombstones its internal doc id; postings are
+    compacted once tombstones outnumber live documents.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.fingerprint = None
+        self._chunk_ids = []            # internal doc id -> chunk_id
+        self._doc_of = {}               # chunk_id -> internal doc id (live docs only)
+        self._lengths = array("I")      # internal doc id -> token count
+        self._alive = array("B")        # internal doc id -> 1 if live
+        self._postings = {}             # term -> (array("I") doc ids, array("I") tfs)
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._doc_of)
+
+    def add(self, chunk_id, text):
+        if chunk_id in self._doc_of:
+            return
+        tokens = tokenize(text)
+        doc = len(self._chunk_ids)
+        self._chunk_ids.append(chunk_id)
+        self._doc_of[chunk_id] = doc
+        self._lengths.append(len(tokens))
+        self._alive.append(1)
+        self._total_length += len(tokens)
+
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            docs, tfs = self._postings.setdefault(term, (array("I"), array("I")))
+            docs.append(doc)
+            tfs.append(tf)
+
+    def remove(self, chunk_id):
+        doc = self._doc_of.pop(chunk_id, None)
+        if doc is None:
+            return
+        self._alive[doc] = 0
+        self._total_length -= self._lengths[doc]
+
+    def sync(self, chunks, fingerprint=None):
+        """
+        Brings the index in line with `chunks` ({chunk_id: text}), touching only
+        the difference. Returns (added, removed).
+        """
+        stale = [cid for cid in self._doc_of if cid not in chunks]
+        for cid in stale:
+            self.remove(cid)
+        new = [cid for cid in chunks if cid not in self._doc_of]
+        for cid in new:
+            self.add(cid, chunks[cid])
+
+        if len(self._chunk_ids) > 2 * max(len(self._doc_of), 1):
+            self._compact()
+        self.fingerprint = fingerprint
+        return len(new), len(stale)
+
+    def search(self, query, k=10):
+        """Returns up to k (chunk_id, score) pairs, best first."""
+        live = len(self._doc_of)
+        if not live:
+            return []
+
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths / (self._total_length / live))
+        scores = np.zeros(len(self._chunk_ids), dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            docs = np.frombuffer(postings[0], dtype=np.uint32)
+            tfs = np.frombuffer(postings[1], dtype=np.uint32).astype(np.float32)
+            alive = np.frombuffer(self._alive, dtype=np.uint8)[docs].astype(bool)
+            docs, tfs = docs[alive], tfs[alive]
+            if not len(docs):
+                continue
+            idf = math.log(1 + (live - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(self._chunk_ids[doc], float(scores[doc])) for doc in candidates]
+
+    def _compact(self):
+        # Rebuild postings without tombstoned docs; live docs get fresh contiguous ids
+        live = {cid: doc for cid, doc in self._doc_of.items()}
+        remap = {doc: new for new, doc in enumerate(sorted(live.values()))}
+        for term in list(self._postings):
+            docs, tfs = self._postings[term]
+            kept = [(remap[d], tf) for d, tf in zip(docs, tfs) if d in remap]
+            if kept:
+                self._postings[term] = (array("I", [d for d, _ in kept]), array("I", [tf for _, tf in kept]))
+            else:
+                del self._postings[term]
+        order = sorted(live.values())
+        self._chunk_ids = [self._chunk_ids[doc] for doc in order]
+        self._lengths = array("I", [self._lengths[doc] for doc in order])
+        self._alive = array("B", [1] * len(order))
+        self._doc_of = {cid: remap[doc] for cid, doc in live.items()}
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, "rb") as f:
+            index.__dict__.update(pickle.load(f))
+        return index
+
+
+def sync_bm25_index(persist_directory, chunks, fingerprint):
+    """
+    Loads the BM25 index stored next to a Chroma store and updates it to match
+    `chunks`, the deduplicated {chunk_id: Document} mapping from sync_vector_store.
+    Skips all work when the store fingerprint hasn't changed.
+    """
+    path = os.path.join(persist_directory, BM25_INDEX_FILE)
+    index = BM25Index.load(path) if os.path.exists(path) else BM25Index()
+    if index.fingerprint == fingerprint:
+        return index, (0, 0)
+
+    changes = index.sync({cid: doc.page_content for cid, doc in chunks.items()}, fingerprint)
+    index.save(path)
+    return index, changes
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses Chroma vector search with BM25 using reciprocal-rank fusion:
+    score(chunk) = sum over rankings of 1 / (rrf_k + rank).
+    """
+
+    vectorstore: object
+    bm25: object
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        # Both indexes hold the same chunks (synced on the store fingerprint); asking Chroma
+        # for more results than it has logs a warning on every query
+        fetch_k = min(self.fetch_k, len(self.bm25))
+        if fetch_k == 0:
+            return []
+        vector_docs = self.vectorstore.similarity_search(query, k=fetch_k)
+        lexical_hits = self.bm25.search(query, k=fetch_k)
+
+        fused = {}
+        docs_by_id = {}
+        for rank, doc in enumerate(vector_docs):
+            cid = doc.metadata.get("chunk_id")
+            docs_by_id[cid] = doc
+            fused[cid] = fused.get(cid, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        for rank, (cid, _) in enumerate(lexical_hits):
+            fused[cid] = fused.get(cid, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+
+        top_ids = sorted(fused, key=fused.get, reverse=True)[:self.k]
+
+        # Chunks found only by BM25 still need their text and metadata from Chroma
+        missing = [cid for cid in top_ids if cid not in docs_by_id]
+        if missing:
+            stored = self.vectorstore.get(ids=missing, include=["documents", "metadatas"])
+            for cid, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+                docs_by_id[cid] = Document(page_content=text, metadata=metadata or {})
+
+        return [docs_by_id[cid] for cid in top_ids if cid in docs_by_id]
@@ -0,0 +1,253 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import chromadb
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from ingestion import COLLECTION_NAME, chunk_id, delete_stale_chunks, open_vector_store
+
+# Streaming ingestion for corpora too large to load at once:
+#   read (fixed-size blocks) -> split -> embed (process pool, fixed-size batches) -> bulk upsert
+# Only a bounded number of batches is ever in memory. Chunk IDs are the same
+# content hashes as ingestion.py, so upserts are idempotent and an interrupted
+# run can resume from its checkpoint by simply replaying the last block.
+# Block boundaries depend only on the file and the offset they start at, so a
+# resumed run splits the rest of the corpus exactly like an uninterrupted one.
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_BLOCK_BYTES = 1 << 20   # 1 MiB read size per file block
+BLOCK_BOUNDARIES = (b"\n\n", b"\n", b". ", b" ")
+
+_worker_model = None
+
+
+def read_blocks(path, start_offset=0, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    Yields (block_start, block_end, text) for a file, cutting each block at the
+    last paragraph/line/sentence break so chunks rarely straddle two blocks.
+    The next block is re-read from the cut, never carried over, so where a
+    block ends depends only on where it starts.
+    """
+    with open(path, "rb") as f:
+        offset = start_offset
+        while True:
+            f.seek(offset)
+            buffer = f.read(block_bytes)
+            if not buffer:
+                return
+            cut = len(buffer)  # end of file
+            if len(buffer) == block_bytes:
+                cuts = [buffer.rfind(sep) + len(sep) for sep in BLOCK_BOUNDARIES if sep in buffer]
+                cut = max(cuts) if cuts else len(buffer)  # one enormous "word"; cut anyway
+            yield offset, offset + cut, buffer[:cut].decode("utf-8", errors="replace")
+            offset += cut
+
+
+def iter_chunks(files, splitter, chunk_size, chunk_overlap, checkpoint=None, stats=None,
+                seen=None, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    Yields (id, text, metadata, position) for every chunk, where position is
+    the (file, block_start) to resume from if processing stops after this chunk.
+    When resuming, the part of the corpus before the checkpoint is still read
+    and split (not embedded) so that `seen` ends up with every chunk id.
+    """
+    resume_file = checkpoint.get("file") if checkpoint else None
+    resume_offset = checkpoint.get("offset", 0) if checkpoint else 0
+
+    for path in files:
+        for block_start, block_end, text in read_blocks(path, block_bytes=block_bytes):
+            done = resume_file is not None and (path, block_start) < (resume_file, resume_offset)
+            if stats is not None and not done:
+                stats["bytes"] += block_end - block_start
+            for chunk in splitter.split_text(text):
+                cid = chunk_id(chunk, path, chunk_size, chunk_overlap)
+                if seen is not None:
+                    seen.add(cid)
+                if not done:
+                    yield cid, chunk, {"source": path, "chunk_id": cid}, (path, block_start)
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _init_worker(model_name):
+    # Each worker process loads the model once and keeps it for every batch
+    global _worker_model
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    _worker_model = HuggingFaceEmbeddings(model_name=model_name)
+
+
+def _embed_batch(texts):
+    return _worker_model.embed_documents(texts)
+
+
+def load_checkpoint(path, settings):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("settings") != settings:
+        print(f"Checkpoint {path} was written with different settings; starting over.")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def ingest(corpus, pattern, persist_directory, chunk_size, chunk_overlap, batch_size=256,
+           workers=2, checkpoint_path=None, resume=True, model_name=EMBEDDING_MODEL,
+           block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    Streams every file matching `pattern` under `corpus` into the Chroma store at
+    `persist_directory`, then deletes chunks that are no longer in the corpus.
+    Returns a stats dict (chunks, bytes, seconds, rates, removed).
+    """
+    files = sorted(glob.glob(os.path.join(corpus, "**", pattern), recursive=True))
+    settings = {"corpus": corpus, "pattern": pattern, "persist_directory": persist_directory,
+                "chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "model": model_name}
+    checkpoint_path = checkpoint_path or os.path.join(persist_directory, "ingest_checkpoint.json")
+    os.makedirs(persist_directory, exist_ok=True)
+
+    # Size + mtime per file, so an edit that keeps the size still counts as a change
+    file_stamps = {path: [os.stat(path).st_size, os.stat(path).st_mtime_ns] for path in files}
+    checkpoint = load_checkpoint(checkpoint_path, settings) if resume else None
+    if checkpoint and checkpoint.get("complete"):
+        if checkpoint.get("files") == file_stamps:
+            print("Nothing to do: corpus unchanged since the last complete run (use --no-resume to redo).")
+            return checkpoint["stats"]
+        checkpoint = None  # corpus changed: full pass, then chunks it no longer has are deleted
+    if checkpoint:
+        print(f"Resuming from {checkpoint['file']} at byte {checkpoint['offset']}")
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    stats = {"chunks": 0, "bytes": 0, "batches": 0}
+    seen = set()
+    chunks = iter_chunks(files, splitter, chunk_size, chunk_overlap, checkpoint, stats, seen, block_bytes)
+
+    # Workers are spawned (not forked) so they never inherit Chroma's threads or handles
+    if workers > 0:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(model_name,),
+                                       mp_context=multiprocessing.get_context("spawn"))
+        embed = lambda texts: executor.submit(_embed_batch, texts)
+    else:
+        executor = None
+        _init_worker(model_name)
+        embed = lambda texts: _ImmediateResult(_embed_batch(texts))
+
+    # open_vector_store handles stores from an older chromadb; upserts go through
+    # the chromadb collection directly since the vectors are already computed
+    _, existing = open_vector_store(persist_directory, None)
+    collection = chromadb.PersistentClient(path=persist_directory).get_collection(COLLECTION_NAME)
+    start_time = time.time()
+    # Back-pressure: never more than two batches per worker waiting to be upserted
+    max_in_flight = max(1, workers) * 2
+    in_flight = deque()
+
+    def drain_one():
+        batch, future = in_flight.popleft()
+        vectors = future.result()
+        collection.upsert(
+            ids=[cid for cid, _, _, _ in batch],
+            embeddings=vectors,
+            metadatas=[metadata for _, _, metadata, _ in batch],
+            documents=[text for _, text, _, _ in batch],
+        )
+        stats["chunks"] += len(batch)
+        stats["batches"] += 1
+        # Batches finish in submission order, so everything before this block is stored
+        resume_file, resume_offset = batch[-1][3]
+        save_checkpoint(checkpoint_path, {"settings": settings, "file": resume_file,
+                                          "offset": resume_offset, "complete": False})
+        if stats["batches"] % 10 == 0:
+            _report(stats, start_time)
+
+    try:
+        for batch in batched(chunks, batch_size):
+            in_flight.append((batch, embed([text for _, text, _, _ in batch])))
+            if len(in_flight) >= max_in_flight:
+                drain_one()
+        while in_flight:
+            drain_one()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    # Everything this pass didn't produce is from deleted/edited files or other settings
+    stale = delete_stale_chunks(collection, existing, seen)
+    print(f"  Removed {len(stale)} chunks no longer in the corpus")
+
+    result = _report(stats, start_time)
+    result["removed"] = len(stale)
+    save_checkpoint(checkpoint_path, {"settings": settings, "complete": True, "files": file_stamps,
+                                      "stats": result})
+    return result
+
+
+class _ImmediateResult:
+    # Same interface as a Future for the in-process (--workers 0) path
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
+
+
+def _report(stats, start_time):
+    elapsed = max(time.time() - start_time, 1e-9)
+    result = {
+        "chunks": stats["chunks"],
+        "bytes": stats["bytes"],
+        "seconds": elapsed,
+        "chunks_per_sec": stats["chunks"] / elapsed,
+        "mb_per_sec": stats["bytes"] / elapsed / 1e6,
+    }
+    print(f"  {result['chunks']} chunks | {result['bytes'] / 1e6:.1f} MB | "
+          f"{result['chunks_per_sec']:.1f} chunks/s | {result['mb_per_sec']:.2f} MB/s")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a text corpus into a Chroma vector store.")
+    parser.add_argument("--corpus", default="data/corpus")
+    parser.add_argument("--glob", default="*.txt", help="File pattern, matched recursively.")
+    parser.add_argument("--persist-directory", default="output/chroma_550")
+    parser.add_argument("--chunk-size", type=int, default=550)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding call.")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Embedding worker processes (0 embeds in this process).")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Checkpoint file (default: <persist-directory>/ingest_checkpoint.json).")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore any existing checkpoint.")
+    parser.add_argument("--embedding-model", default=EMBEDDING_MODEL)
+    args = parser.parse_args(argv)
+
+    print(f"Ingesting {args.corpus}/**/{args.glob} into {args.persist_directory}...")
+    ingest(args.corpus, args.glob, args.persist_directory, args.chunk_size, args.chunk_overlap,
+           batch_size=args.batch_size, workers=args.workers, checkpoint_path=args.checkpoint,
+           resume=not args.no_resume, model_name=args.embedding_model)
+    print("Ingestion complete.")
+
+
+if __name__ == "__main__":
+    main()
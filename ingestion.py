@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from chromadb.api.client import SharedSystemClient
+from langchain_community.vectorstores import Chroma
+
+# Chroma rejects very large add() calls, so we upsert in slices
+UPSERT_BATCH_SIZE = 1000
+COLLECTION_NAME = "langchain"   # LangChain's default; serve.py opens it with chromadb directly
+# What sqlite reports when a store was written by a different chromadb schema
+SCHEMA_MISMATCH_ERRORS = ("no such column", "no such table")
+
+
+def chunk_id(text, source, chunk_size, chunk_overlap):
+    """
+    Stable ID for a chunk: same text + same source + same splitter settings
+    always hash to the same ID, so re-running ingestion is idempotent.
+    """
+    key = json.dumps([source, chunk_size, chunk_overlap, text], ensure_ascii=False)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def assign_chunk_ids(texts, chunk_size, chunk_overlap):
+    """
+    Returns {chunk_id: Document}. Identical chunks from the same source
+    collapse into one entry (they would embed to the same vector anyway).
+    """
+    chunks = {}
+    for doc in texts:
+        cid = chunk_id(doc.page_content, doc.metadata.get("source", ""), chunk_size, chunk_overlap)
+        if cid not in chunks:
+            doc.metadata["chunk_id"] = cid
+            chunks[cid] = doc
+    return chunks
+
+
+def store_fingerprint(chunk_ids):
+    # One hash over the whole index: changes whenever any chunk is added or removed
+    digest = hashlib.sha256()
+    for cid in sorted(chunk_ids):
+        digest.update(cid.encode("ascii"))
+    return digest.hexdigest()
+
+
+def open_vector_store(persist_directory, embedding):
+    """
+    Opens the persisted Chroma store and returns (db, existing chunk ids).
+    A store written with a schema this chromadb version can't read is moved
+    aside to <persist_directory>.unreadable-<timestamp> and recreated empty;
+    sync_vector_store then re-embeds it. Any other database error (e.g. a
+    locked store) is raised unchanged.
+    """
+    try:
+        db = Chroma(collection_name=COLLECTION_NAME, persist_directory=persist_directory,
+                    embedding_function=embedding)
+        return db, set(db.get(include=[])["ids"])
+    except sqlite3.OperationalError as e:
+        if not str(e).startswith(SCHEMA_MISMATCH_ERRORS):
+            raise
+        aside = f"{persist_directory}.unreadable-{time.strftime('%Y%m%d-%H%M%S')}"
+        print(f"  Could not read {persist_directory} ({e}); moved it to {aside} and rebuilding.")
+    os.replace(persist_directory, aside)
+    # Chroma caches one client per path, including the one that just failed
+    SharedSystemClient.clear_system_cache()
+    db = Chroma(collection_name=COLLECTION_NAME, persist_directory=persist_directory,
+                embedding_function=embedding)
+    return db, set()
+
+
+def delete_stale_chunks(db, existing, wanted):
+    """
+    Deletes every id in `existing` that isn't in `wanted` from the store and
+    returns the deleted ids.
+    """
+    stale = [cid for cid in existing if cid not in wanted]
+    for start in range(0, len(stale), UPSERT_BATCH_SIZE):
+        db.delete(ids=stale[start:start + UPSERT_BATCH_SIZE])
+    return stale
+
+
+def sync_vector_store(texts, embedding, persist_directory, chunk_size, chunk_overlap):
+    """
+    Reopens the persisted Chroma collection and brings it in line with `texts`:
+    only new/changed chunks are embedded, stale ones are deleted.
+    With an unchanged corpus nothing is embedded at all.
+
+    Returns (db, stats) where stats has added/removed/unchanged counts, a
+    fingerprint of the resulting index and the deduplicated chunks as
+    {chunk_id: Document}.
+    """
+    db, existing = open_vector_store(persist_directory, embedding)
+    wanted = assign_chunk_ids(texts, chunk_size, chunk_overlap)
+
+    # 1. Drop chunks that no longer exist in the corpus (or were split differently)
+    stale = delete_stale_chunks(db, existing, wanted)
+
+    # 2. Embed only what the store hasn't seen yet
+    new_ids = [cid for cid in wanted if cid not in existing]
+    for start in range(0, len(new_ids), UPSERT_BATCH_SIZE):
+        batch = new_ids[start:start + UPSERT_BATCH_SIZE]
+        db.add_documents([wanted[cid] for cid in batch], ids=batch)
+
+    stats = {
+        "added": len(new_ids),
+        "removed": len(stale),
+        "unchanged": len(wanted) - len(new_ids),
+        "fingerprint": store_fingerprint(wanted),
+        "chunks": wanted,
+    }
+    return db, stats
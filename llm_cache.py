@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.caches import BaseCache
+from langchain_core.outputs import Generation
+
+CACHE_MODES = ("record", "replay", "passthrough")
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay mode when a prompt was never recorded."""
+
+
+def llm_identity(llm):
+    """
+    Everything besides the prompt that changes an Ollama answer: server, model
+    and generation options. The pinned langchain-core builds `llm_string` from
+    BaseLLM's empty _identifying_params, so it can't tell two models apart;
+    pass this to ResponseCache as its namespace instead.
+    """
+    return json.dumps({"base_url": llm.base_url, **llm._default_params}, sort_keys=True, default=str)
+
+
+class ResponseCache(BaseCache):
+    """
+    Durable record/replay cache for LLM responses, installed with
+    langchain.globals.set_llm_cache().
+
+    LangChain hands us the fully rendered prompt and an `llm_string`; the key
+    is (namespace, llm_string, prompt), where `namespace` is the llm_identity()
+    of the model being cached. A cache serves one model: answers recorded
+    under another namespace are misses.
+
+    Modes:
+      record      - serve hits from disk, call the model on a miss and store the answer
+      replay      - serve hits from disk, raise CacheMissError on a miss (no model needed)
+      passthrough - never read or write; every call goes to the model
+    """
+
+    def __init__(self, path, mode="record", namespace=""):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {CACHE_MODES}")
+        self.path = path
+        self.mode = mode
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # The evaluation runner calls the LLM from several threads
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " llm_string TEXT NOT NULL,"
+            " prompt TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _identity(self, llm_string):
+        # Stored as the row's llm_string, so the table shows which model each answer came from
+        return f"{self.namespace}\0{llm_string}" if self.namespace else llm_string
+
+    def _key(self, prompt, llm_string):
+        return hashlib.sha256(f"{self._identity(llm_string)}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        if self.mode == "passthrough":
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (self._key(prompt, llm_string),)
+            ).fetchone()
+            if row is not None:
+                self.hits += 1
+                return [Generation(text=text) for text in json.loads(row[0])]
+            self.misses += 1
+
+        if self.mode == "replay":
+            raise CacheMissError(f"No recorded response for prompt ({len(prompt)} chars) in {self.path}")
+        return None
+
+    def update(self, prompt, llm_string, return_val):
+        if self.mode != "record":
+            return
+        response = json.dumps([generation.text for generation in return_val])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (self._key(prompt, llm_string), self._identity(llm_string), prompt, response, time.time()),
+            )
+            self._conn.commit()
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return f"LLM cache ({self.mode}): {self.hits} hits, {self.misses} misses ({hit_rate:.0%} hit rate)"
@@ -6,22 +6,83 @@ import time
 from langchain_community.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain_community.llms import Ollama
 from langchain.chains import RetrievalQA
 
+from context_packing import pack_context
+from ingestion import sync_vector_store
+from semantic_cache import SemanticAnswerCache
+from streaming import StreamingTimer
+
 # Configuration Constants
 # We use "speech.txt" as required by Assignment 1 [cite: 8]
 SOURCE_DOCUMENT = "speech.txt"
 VECTOR_STORE_PATH = "output/chroma_db"
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 LLM_MODEL = "mistral"
+OLLAMA_URL = "http://localhost:11434"
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+RETRIEVAL_K = 3
+CONTEXT_TOKEN_BUDGET = 1500     # overlapping/duplicate chunk text is removed before this is applied
 
-def main():
+# Semantic answer cache: near-duplicate questions reuse a previous answer
+ANSWER_CACHE_THRESHOLD = 0.95   # cosine similarity between question embeddings
+ANSWER_CACHE_TTL = 3600         # seconds
+ANSWER_CACHE_MAX_ENTRIES = 256
+
+# Print tokens as Ollama produces them instead of waiting for the full answer
+STREAM_ANSWERS = True
+
+def answer_query(query, embeddings, db, qa_chain, answer_cache, timer=None):
     """
-    Main execution function for the AmbedkarGPT RAG Pipeline.
+    Runs one question through the cache and, on a miss, the RAG chain.
+    Returns (response, cache_hit) where response has 'result' and 'source_documents'.
+    Pass a StreamingTimer to stream tokens and collect per-stage timings.
+    """
+    timer = timer or StreamingTimer()
+
+    # Embed once: the same vector drives both the cache lookup and retrieval
+    with timer.retrieval():
+        query_vector = embeddings.embed_query(query)
+
+    cached = answer_cache.lookup(query_vector)
+    if cached is not None:
+        return cached[0], True
+
+    with timer.retrieval():
+        docs = db.similarity_search_by_vector(query_vector, k=RETRIEVAL_K)
+    response, _ = generate_response(query, docs, qa_chain.combine_documents_chain, timer,
+                                    answer_cache=answer_cache, query_vector=query_vector)
+    return response, False
+
+def generate_response(query, docs, combine_chain, timer=None, token_budget=CONTEXT_TOKEN_BUDGET,
+                      answer_cache=None, query_vector=None):
+    """
+    The generation half of answer_query, shared with evaluation, serve and benchmark:
+    packs the retrieved chunks into the token budget (0 disables packing), runs the
+    "stuff" chain and, if an answer cache is given, stores the answer under query_vector.
+    Returns (response, packing_stats).
+    """
+    if token_budget:
+        context, packing = pack_context(docs, token_budget)
+    else:
+        context, packing = docs, None
+    answer = combine_chain.invoke(
+        {"input_documents": context, "question": query},
+        config={"callbacks": [timer] if timer is not None else []}
+    )
+    response = {"result": answer["output_text"], "source_documents": docs}
+
+    if answer_cache is not None:
+        answer_cache.store(query, query_vector, response)
+    return response, packing
+
+def build_pipeline(ollama_url=OLLAMA_URL):
+    """
+    Loads, splits and indexes the speech and builds the QA chain.
+    Returns (embeddings, db, qa_chain, answer_cache); shared with serve.py.
     """
-    print("--- Starting AmbedkarGPT Initialization ---")
 
     # 1. Load the provided text file [cite: 8]
     if not os.path.exists(SOURCE_DOCUMENT):
@@ -36,8 +97,8 @@ def main():
     # We use RecursiveCharacterTextSplitter (industry standard) instead of simple CharacterTextSplitter
     # because it respects sentence boundaries better, leading to higher quality answers.
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,       # Medium chunk size (good starting point)
-        chunk_overlap=50      # Overlap ensures context isn't lost between cuts
+        chunk_size=CHUNK_SIZE,       # Medium chunk size (good starting point)
+        chunk_overlap=CHUNK_OVERLAP  # Overlap ensures context isn't lost between cuts
     )
     texts = text_splitter.split_documents(documents)
     print(f"Document split into {len(texts)} chunks.")
@@ -48,21 +109,26 @@ def main():
     embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
 
     print("Creating/Loading Vector Store (ChromaDB)...")
-    # We persist the DB to 'output/' to keep the repo clean
-    db = Chroma.from_documents(
-        documents=texts,
-        embedding=embeddings,
-        persist_directory=VECTOR_STORE_PATH
+    # We persist the DB to 'output/' to keep the repo clean.
+    # Chunks are keyed by content hash, so only new/changed chunks get embedded on restart.
+    db, sync_stats = sync_vector_store(
+        texts,
+        embeddings,
+        persist_directory=VECTOR_STORE_PATH,
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
     )
+    print(f"Vector store synced: {sync_stats['added']} added, "
+          f"{sync_stats['removed']} removed, {sync_stats['unchanged']} unchanged.")
     
     # 4. Initialize the Retrieval QA Chain [cite: 15]
     print(f"Initializing LLM ({LLM_MODEL})...")
     try:
         # We use Ollama locally as requested [cite: 18]
-        llm = Ollama(model=LLM_MODEL)
+        llm = Ollama(model=LLM_MODEL, base_url=ollama_url)
         
         # Create the retriever (The interface to find relevant chunks) [cite: 11]
-        retriever = db.as_retriever(search_kwargs={"k": 3}) # Retrieve top 3 relevant chunks
+        retriever = db.as_retriever(search_kwargs={"k": RETRIEVAL_K}) # Retrieve top 3 relevant chunks
         
         # Create the Chain [cite: 12]
         qa_chain = RetrievalQA.from_chain_type(
@@ -76,6 +142,22 @@ def main():
         print("Ensure Ollama is running: 'ollama serve' in a separate terminal.")
         sys.exit(1)
 
+    # Cached answers are tied to this exact index; a re-sync with changes clears them
+    answer_cache = SemanticAnswerCache(
+        threshold=ANSWER_CACHE_THRESHOLD,
+        ttl=ANSWER_CACHE_TTL,
+        max_entries=ANSWER_CACHE_MAX_ENTRIES
+    )
+    answer_cache.bind(sync_stats["fingerprint"])
+    return embeddings, db, qa_chain, answer_cache
+
+def main():
+    """
+    Main execution function for the AmbedkarGPT RAG Pipeline.
+    """
+    print("--- Starting AmbedkarGPT Initialization ---")
+    embeddings, db, qa_chain, answer_cache = build_pipeline()
+
     print("\n--- System Ready! ---\n")
     print("Ask a question about Dr. Ambedkar's speech (or type 'exit' to quit).")
 
@@ -93,14 +175,20 @@ def main():
             print("Thinking...")
             start_time = time.time()
             
-            # Run the query through the chain
-            response = qa_chain.invoke({"query": query})
+            # Run the query through the answer cache, then the chain on a miss
+            timer = StreamingTimer(stream=STREAM_ANSWERS, prefix="\nAnswer: ")
+            response, cache_hit = answer_query(query, embeddings, db, qa_chain, answer_cache, timer)
             
             end_time = time.time()
             
-            # Output the result
-            print(f"\nAnswer: {response['result']}")
-            print(f"\n(Response time: {end_time - start_time:.2f}s)")
+            # Output the result (already printed token by token if it was streamed)
+            if timer.streamed:
+                print()
+            else:
+                print(f"\nAnswer: {response['result']}")
+            print(f"\n(Response time: {end_time - start_time:.2f}s | Cache: {'hit' if cache_hit else 'miss'})")
+            if not cache_hit:
+                print(f"({timer.summary()})")
             
             # Optional: Show where the info came from (Makes you look pro)
             # print("\n[Source Context Used]:")
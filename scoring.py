@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import nltk
+import numpy as np
+from nltk.stem import porter
+from nltk.tokenize import NLTKWordTokenizer
+from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+from rouge_score import rouge_scorer, tokenize, tokenizers
+
+# Batch scoring engine: all (answer, ground truth) pairs of a strategy are scored
+# together. One embedding call covers every text, cosine similarity is a single
+# NumPy pass, and ROUGE/BLEU reuse one scorer per process.
+
+_rouge = None
+_sentence_tokenizer = None
+_word_tokenizer = NLTKWordTokenizer()
+_smoothing = SmoothingFunction().method1
+
+
+class _MemoStemmer:
+    # Porter stemming dominates ROUGE cost and answers share most of their vocabulary
+    def __init__(self):
+        self.stem = lru_cache(maxsize=200_000)(porter.PorterStemmer().stem)
+
+
+class MemoTokenizer(tokenizers.Tokenizer):
+    """Same tokens as rouge_score's DefaultTokenizer(use_stemmer=True), with stems memoized."""
+
+    def __init__(self):
+        self._stemmer = _MemoStemmer()
+
+    def tokenize(self, text):
+        return tokenize.tokenize(text, self._stemmer)
+
+
+def _get_rouge():
+    # One scorer (and one stem cache) per process, reused for every pair
+    global _rouge
+    if _rouge is None:
+        _rouge = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True, tokenizer=MemoTokenizer())
+    return _rouge
+
+
+def _word_tokenize(text):
+    # Equivalent to nltk.word_tokenize, but the punkt model is loaded once per process
+    # instead of being looked up on disk for every call
+    global _sentence_tokenizer
+    if _sentence_tokenizer is None:
+        try:
+            _sentence_tokenizer = nltk.data.load("tokenizers/punkt/english.pickle")
+        except LookupError:
+            _sentence_tokenizer = False
+    if _sentence_tokenizer is False:
+        raise LookupError("NLTK punkt tokenizer is not installed")
+    return [token for sentence in _sentence_tokenizer.tokenize(text)
+            for token in _word_tokenizer.tokenize(sentence)]
+
+
+def calculate_retrieval_metrics(retrieved_docs, true_filenames):
+    hits = 0
+    reciprocal_rank = 0
+
+    retrieved_filenames = [os.path.basename(doc.metadata['source']) for doc in retrieved_docs]
+
+    # HIT RATE: Did we find the right document?
+    if any(f in true_filenames for f in retrieved_filenames):
+        hits = 1
+
+    # MRR: How high up was the right document?
+    for i, fname in enumerate(retrieved_filenames):
+        if fname in true_filenames:
+            reciprocal_rank = 1 / (i + 1)
+            break
+
+    return hits, reciprocal_rank
+
+
+def lexical_scores(pair):
+    """(answer, ground_truth) -> (rouge_l, bleu)."""
+    generated_answer, ground_truth = pair
+
+    # ROUGE (Overlap)
+    rouge_l = _get_rouge().score(ground_truth, generated_answer)['rougeL'].fmeasure
+
+    # BLEU (Translation Quality)
+    try:
+        reference = [_word_tokenize(ground_truth.lower())]
+        candidate = _word_tokenize(generated_answer.lower())
+        bleu = sentence_bleu(reference, candidate, smoothing_function=_smoothing)
+    except Exception:
+        bleu = 0.0
+
+    return rouge_l, bleu
+
+
+def cosine_similarities(answer_vectors, truth_vectors):
+    """Row-wise cosine similarity of two (n, dim) matrices in one vectorized pass."""
+    a = np.asarray(answer_vectors, dtype=np.float32)
+    b = np.asarray(truth_vectors, dtype=np.float32)
+    a_norm = np.linalg.norm(a, axis=1)
+    b_norm = np.linalg.norm(b, axis=1)
+    denominator = np.maximum(a_norm * b_norm, np.finfo(np.float32).tiny)
+    return np.einsum("ij,ij->i", a, b) / denominator
+
+
+def score_batch(answers, ground_truths, embedding_model, retrieved_docs=None, true_sources=None,
+                processes=0, chunksize=512):
+    """
+    Scores aligned lists of answers and ground truths. Returns a dict of
+    per-pair lists: rouge_l, bleu, cosine_sim, plus hit_rate and mrr when
+    retrieved_docs/true_sources are given. With processes > 1, ROUGE/BLEU
+    run in a process pool.
+    """
+    n = len(answers)
+    if n == 0:
+        return {"rouge_l": [], "bleu": [], "cosine_sim": [], "hit_rate": [], "mrr": []}
+
+    # COSINE SIMILARITY (Meaning): one batched embedding call for every text
+    vectors = np.asarray(embedding_model.embed_documents(list(answers) + list(ground_truths)),
+                         dtype=np.float32)
+    cosine = cosine_similarities(vectors[:n], vectors[n:])
+
+    # ROUGE + BLEU: pure Python, so spread over processes for large batches
+    pairs = list(zip(answers, ground_truths))
+    if processes and processes > 1 and n > chunksize:
+        with ProcessPoolExecutor(max_workers=processes,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            lexical = list(pool.map(lexical_scores, pairs, chunksize=chunksize))
+    else:
+        lexical = [lexical_scores(pair) for pair in pairs]
+
+    scores = {
+        "rouge_l": [rouge for rouge, _ in lexical],
+        "bleu": [bleu for _, bleu in lexical],
+        "cosine_sim": cosine.astype(float).tolist(),
+    }
+    if retrieved_docs is not None:
+        retrieval = [calculate_retrieval_metrics(docs, truth) for docs, truth in zip(retrieved_docs, true_sources)]
+        scores["hit_rate"] = [hits for hits, _ in retrieval]
+        scores["mrr"] = [mrr for _, mrr in retrieval]
+    return scores
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    In-memory nearest-neighbour cache of answered questions.
+
+    A new question whose embedding has cosine similarity >= `threshold` with a
+    cached question reuses that answer. Entries expire after `ttl` seconds and
+    the least recently used one is dropped once `max_entries` is reached.
+    Answers are only valid for the index they were generated from, so the
+    cache is bound to a vector-store fingerprint and cleared when it changes.
+    Safe to share between threads.
+    """
+
+    def __init__(self, threshold=0.95, ttl=3600, max_entries=256):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fingerprint = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = []
+        self._matrix = None  # rows are unit-length question embeddings, aligned with _entries
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def bind(self, fingerprint):
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                self.clear()
+                self.fingerprint = fingerprint
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._matrix = None
+
+    def lookup(self, vector):
+        """Returns (response, similarity, cached_question) or None."""
+        with self._lock:
+            self._expire()
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            similarities = self._matrix @ _normalize(vector)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            entry = self._entries[best]
+            entry["last_used"] = time.time()
+            return entry["response"], float(similarities[best]), entry["question"]
+
+    def store(self, question, vector, response):
+        with self._lock:
+            self._expire()
+            if len(self._entries) >= self.max_entries:
+                lru = min(range(len(self._entries)), key=lambda i: self._entries[i]["last_used"])
+                self._drop([lru])
+
+            now = time.time()
+            self._entries.append({"question": question, "response": response,
+                                  "created_at": now, "last_used": now})
+            row = _normalize(vector)[np.newaxis, :]
+            self._matrix = row if self._matrix is None else np.vstack([self._matrix, row])
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        expired = [i for i, entry in enumerate(self._entries) if entry["created_at"] < cutoff]
+        if expired:
+            self._drop(expired)
+
+    def _drop(self, indexes):
+        keep = [i for i in range(len(self._entries)) if i not in set(indexes)]
+        self._entries = [self._entries[i] for i in keep]
+        self._matrix = self._matrix[keep] if keep else None
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -0,0 +1,403 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import chromadb
+from langchain_core.documents import Document
+
+from ingestion import COLLECTION_NAME
+from main import OLLAMA_URL, RETRIEVAL_K, VECTOR_STORE_PATH, build_pipeline, generate_response
+
+# Long-lived query service around the main.py pipeline. The embedding model,
+# Chroma store and QA chain are loaded once and stay warm; questions that
+# arrive together are embedded and retrieved in a single batched call.
+#   python serve.py serve --port 8765
+#   python serve.py batch --input questions.jsonl --output answers.jsonl
+# Endpoints: POST /query {"question": ...}, GET /metrics, GET /health
+
+DEFAULT_PORT = 8765
+MAX_BATCH_SIZE = 32         # questions per embedding/retrieval call
+MAX_BATCH_WAIT = 0.01       # seconds the first question waits for others to join its batch
+GENERATION_CONCURRENCY = 4  # simultaneous Ollama requests
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGES = ("embed", "retrieve", "generate", "total")
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram in the Prometheus bucket layout."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class ServiceMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+        self.counters = {"requests": 0, "errors": 0, "cache_hits": 0, "shared_answers": 0, "batches": 0,
+                         "batched_questions": 0}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.stages[stage].observe(seconds)
+
+    def increment(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] += amount
+
+    def render(self):
+        """Prometheus text exposition format."""
+        with self._lock:
+            lines = ["# TYPE rag_stage_latency_seconds histogram"]
+            for stage, histogram in self.stages.items():
+                lines += histogram.render("rag_stage_latency_seconds", f'stage="{stage}"')
+            for counter, value in self.counters.items():
+                lines += [f"# TYPE rag_{counter}_total counter", f"rag_{counter}_total {value}"]
+        return "\n".join(lines) + "\n"
+
+
+class MicroBatcher:
+    """
+    Collects questions from concurrent requests and runs them through one
+    embed_documents call and one Chroma query. A batch closes when it holds
+    `max_batch_size` questions or `max_wait` seconds after its first question.
+    Repeated questions in a batch are embedded and retrieved once, and
+    questions that hit the semantic answer cache skip retrieval.
+    """
+
+    def __init__(self, embeddings, collection, answer_cache, metrics, k, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait=MAX_BATCH_WAIT):
+        self.embeddings = embeddings
+        self.collection = collection
+        self.answer_cache = answer_cache
+        self.metrics = metrics
+        self.k = k
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, question):
+        """Returns a Future of (vector, docs, cached_response); docs is None on a cache hit."""
+        future = Future()
+        self._queue.put((question, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                results = self._process([question for question, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for question, future in batch:
+                future.set_result(results[question])
+
+    def _process(self, questions):
+        """Returns {question: (vector, docs, cached_response)} for the distinct questions."""
+        self.metrics.increment("batches")
+        self.metrics.increment("batched_questions", len(questions))
+        unique = list(dict.fromkeys(questions))
+
+        # 1. One embedding call for the whole batch (embed_query is embed_documents of one text)
+        start = time.perf_counter()
+        vectors = dict(zip(unique, self.embeddings.embed_documents(unique)))
+        embed_s = time.perf_counter() - start
+
+        cached = {question: self.answer_cache.lookup(vectors[question]) for question in unique}
+        misses = [question for question in unique if cached[question] is None]
+
+        # 2. One Chroma query for every question that still needs context
+        retrieve_s = 0.0
+        docs = {}
+        n_results = min(self.k, self.collection.count())
+        if misses and n_results:
+            start = time.perf_counter()
+            found = self.collection.query(query_embeddings=[vectors[question] for question in misses],
+                                          n_results=n_results, include=["documents", "metadatas"])
+            retrieve_s = time.perf_counter() - start
+            for question, texts, metadatas in zip(misses, found["documents"], found["metadatas"]):
+                docs[question] = [Document(page_content=text, metadata=metadata or {})
+                                  for text, metadata in zip(texts, metadatas)]
+
+        # Every question in the batch waited for the whole batched call
+        for question in questions:
+            self.metrics.observe("embed", embed_s)
+            if cached[question] is None:
+                self.metrics.observe("retrieve", retrieve_s)
+        return {question: (vectors[question], docs.get(question, []),
+                           cached[question][0] if cached[question] else None)
+                for question in unique}
+
+
+class QueryService:
+    def __init__(self, embeddings, collection, qa_chain, answer_cache, generation_concurrency=GENERATION_CONCURRENCY,
+                 max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_BATCH_WAIT):
+        self.qa_chain = qa_chain
+        self.answer_cache = answer_cache
+        self.metrics = ServiceMetrics()
+        self.batcher = MicroBatcher(embeddings, collection, answer_cache, self.metrics, RETRIEVAL_K,
+                                    max_batch_size=max_batch_size, max_wait=max_wait)
+        self._generation_slots = threading.Semaphore(generation_concurrency)
+        # question -> Future of its response while it is being generated
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    def answer(self, question):
+        """Returns {answer, sources, cache_hit, shared, timings} for one question."""
+        self.metrics.increment("requests")
+        start = time.perf_counter()
+        vector, docs, cached = self.batcher.submit(question).result()
+
+        generate_s = 0.0
+        shared = False
+        if cached is not None:
+            self.metrics.increment("cache_hits")
+            response = cached
+        else:
+            # The same question asked while it is still being answered waits for that answer
+            with self._in_flight_lock:
+                pending = self._in_flight.get(question)
+                shared = pending is not None
+                if not shared:
+                    pending = self._in_flight[question] = Future()
+            if shared:
+                self.metrics.increment("shared_answers")
+                response = pending.result()
+            else:
+                generate_start = time.perf_counter()
+                try:
+                    with self._generation_slots:
+                        response, _ = generate_response(question, docs, self.qa_chain.combine_documents_chain,
+                                                        answer_cache=self.answer_cache, query_vector=vector)
+                    pending.set_result(response)
+                except Exception as e:
+                    pending.set_exception(e)
+                    raise
+                finally:
+                    with self._in_flight_lock:
+                        del self._in_flight[question]
+                generate_s = time.perf_counter() - generate_start
+                self.metrics.observe("generate", generate_s)
+
+        total_s = time.perf_counter() - start
+        self.metrics.observe("total", total_s)
+        return {
+            "answer": response["result"],
+            "sources": [doc.metadata.get("source") for doc in response["source_documents"]],
+            "cache_hit": cached is not None,
+            "shared": shared,
+            "timings": {"generate_s": generate_s, "total_s": total_s},
+        }
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, self.service.metrics.render().encode("utf-8"), "text/plain; version=0.0.4")
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/query":
+            self.send_error(404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            question = json.loads(self.rfile.read(length) or b"{}").get("question", "")
+        except (ValueError, AttributeError):
+            self._send_json(400, {"error": "body must be a JSON object"})
+            return
+        if not isinstance(question, str) or not question.strip():
+            self._send_json(400, {"error": "missing 'question'"})
+            return
+        try:
+            self._send_json(200, self.service.answer(question))
+        except Exception as e:
+            self.service.metrics.increment("errors")
+            self._send_json(500, {"error": str(e)})
+
+    def _send_json(self, status, obj):
+        self._send(status, json.dumps(obj).encode("utf-8"), "application/json")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # per-request logging would drown the startup output
+
+
+def start_server(service, host="127.0.0.1", port=DEFAULT_PORT):
+    """Serves `service` on a background thread. Returns (server, base_url)."""
+    handler = type("ConfiguredHandler", (QueryHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def post_question(base_url, question, timeout):
+    request = urllib.request.Request(f"{base_url}/query", data=json.dumps({"question": question}).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return {"error": json.loads(e.read() or b"{}").get("error", str(e))}
+
+
+def run_batch(base_url, input_path, output_path, field="question", concurrency=16, timeout=300.0):
+    """
+    Streams questions from a JSONL file through the service and writes one JSON
+    line per input line, in input order. Returns throughput stats.
+    """
+    stats = {"questions": 0, "errors": 0, "cache_hits": 0}
+    start_time = time.time()
+
+    def ask(record):
+        if not isinstance(record, dict) or not isinstance(record.get(field), str):
+            return {"error": f"missing '{field}'"}
+        try:
+            return post_question(base_url, record[field], timeout)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def write(out, record, future):
+        result = future.result()
+        line = {"id": record.get("id") if isinstance(record, dict) else None}
+        if isinstance(record, dict) and field in record:
+            line["question"] = record[field]
+        line.update(result)
+        out.write(json.dumps(line) + "\n")
+        stats["questions"] += 1
+        stats["errors"] += "error" in result
+        stats["cache_hits"] += bool(result.get("cache_hit"))
+        if stats["questions"] % 100 == 0:
+            _report(stats, start_time)
+
+    # Bounded read-ahead: only a few batches worth of questions are ever in flight
+    in_flight = deque()
+    with open(input_path, "r") as source, open(output_path, "w") as out, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            in_flight.append((record, pool.submit(ask, record)))
+            if len(in_flight) >= concurrency * 2:
+                write(out, *in_flight.popleft())
+        while in_flight:
+            write(out, *in_flight.popleft())
+
+    return _report(stats, start_time)
+
+
+def _report(stats, start_time):
+    elapsed = max(time.time() - start_time, 1e-9)
+    result = dict(stats, seconds=elapsed, questions_per_sec=stats["questions"] / elapsed)
+    print(f"  {result['questions']} answered | {result['errors']} errors | {result['cache_hits']} cache hits | "
+          f"{result['questions_per_sec']:.2f} questions/s")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm RAG query service and JSONL batch client.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Load the pipeline once and answer questions over HTTP.")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--ollama-url", default=OLLAMA_URL)
+    serve.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    serve.add_argument("--max-batch-wait", type=float, default=MAX_BATCH_WAIT,
+                       help="Seconds a question waits for others to join its batch.")
+    serve.add_argument("--generation-concurrency", type=int, default=GENERATION_CONCURRENCY)
+
+    batch = commands.add_parser("batch", help="Stream a JSONL file of questions through a running service.")
+    batch.add_argument("--input", required=True, help="JSONL file, one {\"id\": ..., \"question\": ...} per line.")
+    batch.add_argument("--output", default="output/answers.jsonl")
+    batch.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}")
+    batch.add_argument("--field", default="question", help="Key holding the question text.")
+    batch.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once.")
+    batch.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args(argv)
+
+    if args.command == "batch":
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        print(f"Sending {args.input} to {args.url}...")
+        run_batch(args.url, args.input, args.output, field=args.field, concurrency=args.concurrency,
+                  timeout=args.timeout)
+        print(f"Answers written to {args.output}")
+        return
+
+    print("--- Starting AmbedkarGPT Service ---")
+    embeddings, db, qa_chain, answer_cache = build_pipeline(args.ollama_url)
+    # The LangChain wrapper only searches one query at a time; batches go to the collection itself
+    collection = chromadb.PersistentClient(path=VECTOR_STORE_PATH).get_collection(COLLECTION_NAME)
+    service = QueryService(embeddings, collection, qa_chain, answer_cache,
+                           generation_concurrency=args.generation_concurrency,
+                           max_batch_size=args.max_batch_size, max_wait=args.max_batch_wait)
+    server, base_url = start_server(service, args.host, args.port)
+    print(f"\n--- Listening on {base_url} (POST /query, GET /metrics) ---")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 import os
+import re
 import json
-
-# Ensure directories exist
-os.makedirs("data/corpus", exist_ok=True)
+import random
+import argparse
 
 # --- Define the Texts ---
 
@@ -24,20 +24,7 @@ speeches = {
     "speech6.txt": """The untouchables are not a caste. They are a class. They are the broken men of Indian society. They were the original inhabitants of India who were defeated and subjugated by the invading Aryans. The untouchables were forced to live outside the village. They were denied the right to education. They were denied the right to property. They were condemned to do menial work. The solution to the problem of untouchability lies in the annihilation of caste. The untouchables must fight for their rights. They must organize themselves. They must educate their children. They must enter the government services. They must use political power to protect their interests. The emancipation of the untouchables is impossible without political power."""
 }
 
-# --- Write Files ---
-
-# 1. Create speech.txt (For Main Prototype)
-with open("speech.txt", "w", encoding="utf-8") as f:
-    f.write(speech_txt_content)
-print("Created: speech.txt")
-
-# 2. Create Corpus Files (For Evaluation)
-for filename, content in speeches.items():
-    with open(os.path.join("data/corpus", filename), "w", encoding="utf-8") as f:
-        f.write(content)
-print(f"Created: 6 files in data/corpus/")
-
-# 3. Create test_dataset.json
+# Test questions for the evaluation (Source: 129-154)
 test_data = {
     "test_questions": [
         {"id": 1, "question": "What is the real remedy for caste system according to Document 1?", "ground_truth": "The real remedy is to destroy the belief in the sanctity of the shastras.", "source_documents": ["speech1.txt"], "question_type": "factual", "answerable": True},
@@ -68,6 +55,99 @@ test_data = {
     ]
 }
 
-with open("test_dataset.json", "w", encoding="utf-8") as f:
-    json.dump(test_data, f, indent=4)
-print("Created: test_dataset.json")
+# --- Write Files ---
+
+def write_assignment_data():
+    # Ensure directories exist
+    os.makedirs("data/corpus", exist_ok=True)
+
+    # 1. Create speech.txt (For Main Prototype)
+    with open("speech.txt", "w", encoding="utf-8") as f:
+        f.write(speech_txt_content)
+    print("Created: speech.txt")
+
+    # 2. Create Corpus Files (For Evaluation)
+    for filename, content in speeches.items():
+        with open(os.path.join("data/corpus", filename), "w", encoding="utf-8") as f:
+            f.write(content)
+    print(f"Created: 6 files in data/corpus/")
+
+    # 3. Create test_dataset.json
+    with open("test_dataset.json", "w", encoding="utf-8") as f:
+        json.dump(test_data, f, indent=4)
+    print("Created: test_dataset.json")
+
+# --- Synthetic Data (For Benchmarks) ---
+
+def generate_synthetic_data(output_dir, num_docs, sentences_per_doc, num_questions, seed=42):
+    """
+    Writes a reproducible corpus of `num_docs` files built from the speeches above
+    (sentences recombined with a few words swapped, so every sentence is unique)
+    plus a test_dataset.json with `num_questions` questions in the same format as
+    the assignment dataset. Files are written one at a time, so size is only
+    limited by disk.
+    """
+    rng = random.Random(seed)
+    source_sentences = [s for text in speeches.values() for s in re.split(r"(?<=[.!?])\s+", text)]
+    vocabulary = sorted({w for text in speeches.values() for w in re.findall(r"[a-z']+", text.lower())})
+
+    corpus_dir = os.path.join(output_dir, "corpus")
+    os.makedirs(corpus_dir, exist_ok=True)
+
+    # Decide up front which documents the questions are about
+    targets = {}
+    for qid in range(1, num_questions + 1):
+        targets.setdefault(rng.randrange(num_docs), []).append(qid)
+
+    questions = []
+    for doc in range(num_docs):
+        filename = f"doc{doc:07d}.txt"
+        sentences = []
+        for _ in range(sentences_per_doc):
+            words = rng.choice(source_sentences).split()
+            for _ in range(2):
+                words[rng.randrange(len(words))] = rng.choice(vocabulary)
+            sentences.append(" ".join(words))
+
+        paragraphs = [" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+        with open(os.path.join(corpus_dir, filename), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(paragraphs))
+
+        for qid in targets.get(doc, []):
+            answer = rng.choice(sentences)
+            words = answer.rstrip(".!?").split()
+            start = rng.randrange(max(1, len(words) - 4))
+            questions.append({
+                "id": qid,
+                "question": f"What does {filename} say about {' '.join(words[start:start + 4])}?",
+                "ground_truth": answer,
+                "source_documents": [filename],
+                "question_type": "synthetic",
+                "answerable": True
+            })
+
+    questions.sort(key=lambda q: q["id"])
+    with open(os.path.join(output_dir, "test_dataset.json"), "w", encoding="utf-8") as f:
+        json.dump({"test_questions": questions}, f, indent=4)
+    print(f"Created: {num_docs} files in {corpus_dir}/ and {len(questions)} questions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the assignment data, or a synthetic benchmark corpus.")
+    parser.add_argument("--synthetic-docs", type=int, default=0,
+                        help="Generate a synthetic corpus with this many documents instead.")
+    parser.add_argument("--sentences-per-doc", type=int, default=50)
+    parser.add_argument("--synthetic-questions", type=int, default=200)
+    parser.add_argument("--output-dir", default="data/synthetic")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.synthetic_docs:
+        generate_synthetic_data(args.output_dir, args.synthetic_docs, args.sentences_per_doc,
+                                args.synthetic_questions, args.seed)
+    else:
+        write_assignment_data()
+
+
+if __name__ == "__main__":
+    main()
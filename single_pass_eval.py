@@ -0,0 +1,167 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from langchain.chains.question_answering import load_qa_chain
+from langchain.globals import get_llm_cache, set_llm_cache
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import DirectoryLoader, TextLoader
+from langchain_community.llms import Ollama
+
+from concurrent_eval import ConcurrentRunner, http_timeout
+from llm_cache import CacheMissError, ResponseCache
+from main import generate_response
+from streaming import StreamingTimer
+
+# Single-pass evaluation of many strategies (chunk size x overlap x k):
+# the corpus is loaded once, every chunking is embedded in one batched call,
+# questions are embedded once into a query matrix, and retrieval is an exact
+# L2 top-k over NumPy matrices (the same ranking Chroma uses). Strategies then
+# run in forked worker processes that read all of this without copying it.
+
+QUERY_BLOCK = 256   # questions per distance-matrix block, bounds memory on big corpora
+
+# Filled in by the parent before the pool forks; workers only read it
+_shared = {}
+
+
+def load_corpus(corpus_path):
+    documents = DirectoryLoader(corpus_path, glob="*.txt", loader_cls=TextLoader).load()
+    for doc in documents:
+        # Normalise once so every chunking starts from identical text
+        doc.page_content = doc.page_content.replace("\r\n", "\n").strip()
+    return documents
+
+
+def build_chunkings(documents, embedding_model, chunk_settings):
+    """
+    Splits the corpus for every (chunk_size, overlap) and embeds the union of all
+    chunk texts in one call. Returns ({setting: docs}, {setting: matrix}, costs).
+    """
+    chunkings, costs = {}, {}
+    for size, overlap in chunk_settings:
+        start = time.perf_counter()
+        splitter = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap)
+        chunkings[(size, overlap)] = splitter.split_documents(documents)
+        costs[(size, overlap)] = {"split_s": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    unique_texts = list(dict.fromkeys(doc.page_content for docs in chunkings.values() for doc in docs))
+    vectors = np.asarray(embedding_model.embed_documents(unique_texts), dtype=np.float32)
+    embed_s = time.perf_counter() - start
+    row_of = {text: row for row, text in enumerate(unique_texts)}
+
+    matrices = {}
+    for setting, docs in chunkings.items():
+        rows = [row_of[doc.page_content] for doc in docs]
+        matrices[setting] = vectors[rows]
+        # Each chunking is charged its share of the single embedding call
+        costs[setting]["embed_s"] = embed_s * len(set(rows)) / max(len(unique_texts), 1)
+    return chunkings, matrices, costs
+
+
+def top_k_l2(query_matrix, chunk_matrix, k):
+    """Indices of the k nearest chunks (squared L2) for every query row, nearest first."""
+    k = min(k, chunk_matrix.shape[0])
+    # ||q - c||^2 = ||q||^2 - 2 q.c + ||c||^2; ||q||^2 is constant per row so it can't change the order
+    chunk_norms = np.einsum("ij,ij->i", chunk_matrix, chunk_matrix)
+    results = []
+    for start in range(0, len(query_matrix), QUERY_BLOCK):
+        distances = chunk_norms[np.newaxis, :] - 2.0 * (query_matrix[start:start + QUERY_BLOCK] @ chunk_matrix.T)
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(distances, top, axis=1), axis=1)
+        results.append(np.take_along_axis(top, order, axis=1))
+    return np.vstack(results)
+
+
+def _init_worker(llm_cache_path, llm_cache_mode, llm_cache_namespace):
+    # SQLite connections must not cross a fork, so each worker opens its own
+    set_llm_cache(ResponseCache(llm_cache_path, mode=llm_cache_mode, namespace=llm_cache_namespace))
+
+
+def _run_strategy(index):
+    config = _shared["config"]
+    chunk_size, overlap, k = _shared["strategies"][index]
+    docs = _shared["chunkings"][(chunk_size, overlap)]
+    questions = _shared["questions"]
+
+    start = time.perf_counter()
+    neighbours = top_k_l2(_shared["query_matrix"], _shared["matrices"][(chunk_size, overlap)], k)
+    retrieval_s = time.perf_counter() - start
+
+    llm = Ollama(model=config["model"], base_url=config["ollama_url"], timeout=http_timeout(config["timeout"]))
+    chain = load_qa_chain(llm, chain_type="stuff")
+
+    def retrieve(i):
+        # top_k_l2 searched for every question at once; each is charged an equal share
+        return {"docs": [docs[j] for j in neighbours[i]], "retrieval_s": retrieval_s / max(len(questions), 1)}
+
+    def generate(i, retrieved):
+        # Fresh timer per attempt, so a timed-out attempt still streaming can't touch the retry's
+        timer = StreamingTimer()
+        timer.retrieval_time = retrieved["retrieval_s"]
+        response, packing = generate_response(questions[i]["question"], retrieved["docs"], chain, timer,
+                                              config["context_budget"])
+        return response["result"], timer.timings(), packing
+
+    runner = ConcurrentRunner(concurrency=config["concurrency"], timeout=config["timeout"],
+                              retries=config["retries"], backoff=config["backoff"],
+                              fatal_errors=(CacheMissError,))
+    llm_cache = get_llm_cache()
+    cache_before = (llm_cache.hits, llm_cache.misses) if llm_cache else (0, 0)
+    start = time.perf_counter()
+    outcomes = runner.run_many([(list(range(len(questions))), retrieve, generate)])[0]
+    generation_s = time.perf_counter() - start
+    cache_after = (llm_cache.hits, llm_cache.misses) if llm_cache else (0, 0)
+
+    return outcomes, {"retrieval_s": retrieval_s, "generation_s": generation_s,
+                      "llm_cache_hits": cache_after[0] - cache_before[0],
+                      "llm_cache_misses": cache_after[1] - cache_before[1]}
+
+
+def run_single_pass(corpus_path, questions, embedding_model, strategies, config, workers=1):
+    """
+    strategies: list of (chunk_size, chunk_overlap, k). config["concurrency"] bounds
+    generation calls across all workers; workers beyond it would sit idle and are
+    not started. Returns (results, shared_costs)
+    where results is a list of (strategy, outcomes, cost) with outcomes in the same
+    shape evaluation.score_strategy expects.
+    """
+    shared_costs = {}
+
+    start = time.perf_counter()
+    documents = load_corpus(corpus_path)
+    shared_costs["load_s"] = time.perf_counter() - start
+
+    chunk_settings = list(dict.fromkeys((size, overlap) for size, overlap, _ in strategies))
+    chunkings, matrices, chunk_costs = build_chunkings(documents, embedding_model, chunk_settings)
+
+    # One query matrix serves every strategy
+    start = time.perf_counter()
+    query_matrix = np.asarray(embedding_model.embed_documents([q["question"] for q in questions]),
+                              dtype=np.float32)
+    shared_costs["query_embed_s"] = time.perf_counter() - start
+
+    # --concurrency is the total for all strategies, so it is split between the workers
+    workers = max(1, min(workers, config["concurrency"]))
+    worker_config = dict(config, concurrency=config["concurrency"] // workers)
+    print(f"  {workers} strategy worker(s), {worker_config['concurrency']} LLM call(s) each")
+    _shared.update(config=worker_config, strategies=strategies, chunkings=chunkings, matrices=matrices,
+                   questions=questions, query_matrix=query_matrix)
+
+    if workers > 1:
+        # fork: workers inherit the corpus and matrices copy-on-write instead of pickling them
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                                 initializer=_init_worker,
+                                 initargs=(config["llm_cache_path"], config["llm_cache_mode"],
+                                           config["llm_cache_namespace"])) as pool:
+            strategy_runs = list(pool.map(_run_strategy, range(len(strategies))))
+    else:
+        strategy_runs = [_run_strategy(i) for i in range(len(strategies))]
+
+    results = []
+    for (size, overlap, k), (outcomes, cost) in zip(strategies, strategy_runs):
+        cost = {**chunk_costs[(size, overlap)], **cost}
+        results.append(((size, overlap, k), outcomes, cost))
+    return results, shared_costs
@@ -0,0 +1,92 @@
+import sys
+import time
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class StreamingTimer(BaseCallbackHandler):
+    """
+    Callback handler that times one answer and optionally prints tokens as
+    Ollama streams them.
+
+    LangChain's Ollama client streams internally even on invoke() and fires
+    on_llm_new_token for every chunk, so this works with the normal chain.
+    Retrieval is timed by the caller with `with timer.retrieval(): ...`.
+    """
+
+    def __init__(self, stream=False, prefix="", out=None):
+        self.stream = stream
+        self.prefix = prefix
+        self.out = out or sys.stdout
+        self.retrieval_time = 0.0
+        self.reset()
+
+    def reset(self):
+        self.llm_start = None
+        self.first_token = None
+        self.llm_end = None
+        self.token_count = 0
+        self.streamed = False
+
+    @contextmanager
+    def retrieval(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.retrieval_time += time.perf_counter() - start
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        # A retried call starts the generation clock over
+        self.reset()
+        self.llm_start = time.perf_counter()
+
+    def on_llm_new_token(self, token, **kwargs):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+            if self.stream:
+                self.out.write(self.prefix)
+        self.token_count += 1
+        if self.stream:
+            self.out.write(token)
+            self.out.flush()
+            self.streamed = True
+
+    def on_llm_end(self, response, **kwargs):
+        self.llm_end = time.perf_counter()
+        # Ollama reports its own token count on the final chunk; prefer it over our chunk count
+        try:
+            info = response.generations[0][0].generation_info or {}
+            self.token_count = info.get("eval_count") or self.token_count
+        except (IndexError, AttributeError):
+            pass
+
+    def timings(self):
+        """Seconds for each stage; generation fields are None if the LLM was never called."""
+        result = {
+            "retrieval_s": self.retrieval_time,
+            "ttft_s": None,
+            "generation_s": None,
+            "tokens": self.token_count,
+            "tokens_per_s": None,
+        }
+        if self.llm_start is not None and self.llm_end is not None:
+            result["generation_s"] = self.llm_end - self.llm_start
+            if self.first_token is not None:
+                result["ttft_s"] = self.first_token - self.llm_start
+                decode_time = self.llm_end - self.first_token
+                if decode_time > 0 and self.token_count > 1:
+                    result["tokens_per_s"] = (self.token_count - 1) / decode_time
+        return result
+
+    def summary(self):
+        t = self.timings()
+        parts = [f"Retrieval: {t['retrieval_s']:.2f}s"]
+        if t["generation_s"] is not None:
+            if t["ttft_s"] is not None:
+                parts.append(f"TTFT: {t['ttft_s']:.2f}s")
+            if t["tokens_per_s"] is not None:
+                parts.append(f"{t['tokens_per_s']:.1f} tokens/s")
+            parts.append(f"Generation: {t['generation_s']:.2f}s")
+        return " | ".join(parts)
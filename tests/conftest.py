@@ -0,0 +1,46 @@
+import hashlib
+import os
+import sys
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+# The project is a set of top-level scripts rather than a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama import start_server  # noqa: E402
+
+
+@pytest.fixture
+def fake_ollama():
+    """Base URL of a fake Ollama server that answers after 50 ms."""
+    server, base_url = start_server(port=0, latency=0.05)
+    yield base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def slow_ollama():
+    """Base URL of a fake Ollama server that takes a full second per answer."""
+    server, base_url = start_server(port=0, latency=1.0)
+    yield base_url
+    server.shutdown()
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic stand-in for the sentence-transformers model (no download needed)."""
+
+    def __init__(self, dim=16):
+        self.dim = dim
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [byte / 255.0 for byte in digest[:self.dim]]
+
+
+@pytest.fixture
+def embeddings():
+    return HashEmbeddings()
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from langchain_community.llms import Ollama
+
+from concurrent_eval import ConcurrentRunner, http_timeout
+from llm_cache import CacheMissError
+
+
+def prompt_for(item):
+    # fake_ollama answers with the first sentence of the context
+    return f"Instructions\n\nAnswer number {item}. Filler text.\n\nQuestion: q{item}"
+
+
+def test_results_keep_item_order(fake_ollama):
+    llm = Ollama(model="fake", base_url=fake_ollama)
+    items = list(range(8))
+
+    def generate(item, docs):
+        time.sleep((len(items) - item) * 0.02)  # later items finish first
+        return llm.invoke(prompt_for(item))
+
+    results = ConcurrentRunner(concurrency=4).run_many([(items, lambda item: f"docs {item}", generate)])[0]
+
+    assert [docs for docs, _ in results] == [f"docs {item}" for item in items]
+    assert [answer for _, answer in results] == [f"Answer number {item}." for item in items]
+
+
+def test_jobs_share_the_runner(fake_ollama):
+    llm = Ollama(model="fake", base_url=fake_ollama)
+    generate = lambda item, docs: llm.invoke(prompt_for(item))
+
+    first, second = ConcurrentRunner(concurrency=2).run_many([([1, 2], lambda item: None, generate),
+                                                              ([3], lambda item: None, generate)])
+
+    assert [answer for _, answer in first] == ["Answer number 1.", "Answer number 2."]
+    assert [answer for _, answer in second] == ["Answer number 3."]
+
+
+def test_transient_errors_are_retried(fake_ollama):
+    llm = Ollama(model="fake", base_url=fake_ollama)
+    attempts = {}
+
+    def generate(item, docs):
+        attempts[item] = attempts.get(item, 0) + 1
+        if attempts[item] < 3:
+            raise ConnectionError("model server restarting")
+        return llm.invoke(prompt_for(item))
+
+    results = ConcurrentRunner(retries=2, backoff=0.01).run_many([([1, 2], lambda item: None, generate)])[0]
+
+    assert [answer for _, answer in results] == ["Answer number 1.", "Answer number 2."]
+    assert attempts == {1: 3, 2: 3}
+
+
+def test_exhausted_retries_return_the_exception():
+    def generate(item, docs):
+        raise ConnectionError("model server down")
+
+    results = ConcurrentRunner(retries=1, backoff=0.01).run_many([([1], lambda item: None, generate)])[0]
+
+    assert isinstance(results[0], ConnectionError)
+
+
+def test_fatal_errors_are_not_retried():
+    attempts = []
+
+    def generate(item, docs):
+        attempts.append(item)
+        raise CacheMissError("never recorded")
+
+    runner = ConcurrentRunner(retries=3, backoff=0.01, fatal_errors=(CacheMissError,))
+    results = runner.run_many([([1], lambda item: None, generate)])[0]
+
+    assert isinstance(results[0], CacheMissError)
+    assert attempts == [1]
+
+
+def test_timed_out_calls_keep_their_slot(slow_ollama):
+    llm = Ollama(model="fake", base_url=slow_ollama, timeout=5)
+    lock = threading.Lock()
+    active = peak = 0
+
+    def generate(item, docs):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        try:
+            return llm.invoke(prompt_for(item))
+        finally:
+            with lock:
+                active -= 1
+
+    runner = ConcurrentRunner(concurrency=2, timeout=0.2, retries=1, backoff=0.01)
+    results = runner.run_many([(list(range(4)), lambda item: None, generate)])[0]
+
+    assert all(isinstance(result, TimeoutError) for result in results)
+    # Retries wait for the abandoned requests instead of piling more onto the server
+    assert peak == 2
+
+
+def test_http_timeout_never_rounds_to_zero():
+    assert http_timeout(0.2) == 1
+    assert http_timeout(1.5) == 2
+    assert http_timeout(120) == 120
@@ -0,0 +1,33 @@
+import pytest
+
+from embedding_cache import CachedEmbeddings, EmbeddingCache, cache_directory
+
+
+def test_vectors_survive_a_restart(tmp_path, embeddings):
+    cache = EmbeddingCache(str(tmp_path))
+    first = CachedEmbeddings(embeddings, cache, "model").embed_documents(["a", "b"])
+    cache.flush()
+
+    reopened = EmbeddingCache(str(tmp_path))
+    second = CachedEmbeddings(embeddings, reopened, "model").embed_documents(["a", "b"])
+
+    assert [pytest.approx(vector) for vector in first] == second
+    assert (reopened.hits, reopened.misses) == (2, 0)
+
+
+def test_other_dimension_is_a_clear_error(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many(["a"], [[0.0] * 4])
+
+    with pytest.raises(ValueError, match="4-dim vectors but got 8-dim"):
+        cache.put_many(["b"], [[0.0] * 8])
+
+
+def test_models_get_separate_directories(tmp_path):
+    small = EmbeddingCache(cache_directory(str(tmp_path), "org/small-model"))
+    large = EmbeddingCache(cache_directory(str(tmp_path), "org/large-model"))
+
+    small.put_many(["a"], [[0.0] * 4])
+    large.put_many(["a"], [[0.0] * 8])
+
+    assert (small.dim, large.dim) == (4, 8)
@@ -0,0 +1,9 @@
+import pytest
+
+import evaluation
+
+
+def test_single_pass_rejects_hybrid(capsys):
+    with pytest.raises(SystemExit):
+        evaluation.parse_args(["--single-pass", "--hybrid"])
+    assert "--hybrid is not supported with --single-pass" in capsys.readouterr().err
@@ -0,0 +1,56 @@
+import chromadb
+import pytest
+
+import ingest
+from ingestion import COLLECTION_NAME
+
+SETTINGS = {"chunk_size": 120, "chunk_overlap": 20, "batch_size": 4, "workers": 0, "block_bytes": 300}
+
+
+def write_corpus(root, words=("caste", "reform", "constitution")):
+    root.mkdir(exist_ok=True)
+    for n, word in enumerate(words):
+        paragraphs = [" ".join(f"Sentence {i} of paragraph {p} is about {word}." for i in range(p % 4 + 2))
+                      for p in range(30)]
+        (root / f"doc{n}.txt").write_text("\n\n".join(paragraphs))
+
+
+def stored_ids(persist_directory):
+    collection = chromadb.PersistentClient(path=str(persist_directory)).get_collection(COLLECTION_NAME)
+    return set(collection.get(include=[])["ids"])
+
+
+@pytest.fixture(autouse=True)
+def hash_embeddings(monkeypatch, embeddings):
+    monkeypatch.setattr(ingest, "_init_worker", lambda model_name: setattr(ingest, "_worker_model", embeddings))
+
+
+def test_resumed_run_matches_a_clean_run(tmp_path, monkeypatch):
+    write_corpus(tmp_path / "corpus")
+    ingest.ingest(str(tmp_path / "corpus"), "*.txt", str(tmp_path / "clean"), **SETTINGS)
+
+    embed = ingest._embed_batch
+    calls = []
+    def crash_on_tenth_batch(texts):
+        calls.append(texts)
+        if len(calls) == 10:
+            raise RuntimeError("killed")
+        return embed(texts)
+    monkeypatch.setattr(ingest, "_embed_batch", crash_on_tenth_batch)
+    with pytest.raises(RuntimeError):
+        ingest.ingest(str(tmp_path / "corpus"), "*.txt", str(tmp_path / "resumed"), **SETTINGS)
+    monkeypatch.setattr(ingest, "_embed_batch", embed)
+    ingest.ingest(str(tmp_path / "corpus"), "*.txt", str(tmp_path / "resumed"), **SETTINGS)
+
+    assert stored_ids(tmp_path / "resumed") == stored_ids(tmp_path / "clean")
+
+
+def test_same_size_edit_drops_stale_chunks(tmp_path):
+    write_corpus(tmp_path / "corpus")
+    ingest.ingest(str(tmp_path / "corpus"), "*.txt", str(tmp_path / "store"), **SETTINGS)
+    write_corpus(tmp_path / "corpus", words=("casts", "reform", "constitution"))
+    result = ingest.ingest(str(tmp_path / "corpus"), "*.txt", str(tmp_path / "store"), **SETTINGS)
+    ingest.ingest(str(tmp_path / "corpus"), "*.txt", str(tmp_path / "clean"), **SETTINGS)
+
+    assert result["removed"] > 0
+    assert stored_ids(tmp_path / "store") == stored_ids(tmp_path / "clean")
@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+from langchain_core.documents import Document
+
+import ingestion
+from hybrid_search import sync_bm25_index
+
+
+def chunks(*texts, source="speech.txt"):
+    return [Document(page_content=text, metadata={"source": source}) for text in texts]
+
+
+def test_sync_only_embeds_changes(tmp_path, embeddings):
+    store = str(tmp_path / "store")
+    _, first = ingestion.sync_vector_store(chunks("a", "b"), embeddings, store, 250, 50)
+    _, second = ingestion.sync_vector_store(chunks("b", "c"), embeddings, store, 250, 50)
+
+    assert (first["added"], first["removed"]) == (2, 0)
+    assert (second["added"], second["removed"], second["unchanged"]) == (1, 1, 1)
+
+
+def test_locked_store_is_not_rebuilt(tmp_path, embeddings, monkeypatch):
+    store = tmp_path / "store"
+    ingestion.sync_vector_store(chunks("a"), embeddings, str(store), 250, 50)
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(ingestion, "Chroma", locked)
+
+    with pytest.raises(sqlite3.OperationalError):
+        ingestion.open_vector_store(str(store), embeddings)
+    assert [path.name for path in tmp_path.iterdir()] == ["store"]
+
+
+def test_duplicate_chunks_feed_bm25_once(tmp_path, embeddings):
+    store = str(tmp_path / "store")
+    _, stats = ingestion.sync_vector_store(chunks("same", "same", "other"), embeddings, store, 250, 50)
+    bm25, (added, removed) = sync_bm25_index(store, stats["chunks"], stats["fingerprint"])
+
+    assert stats["added"] == 2
+    assert (len(bm25), added, removed) == (2, 2, 0)
@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+from langchain.globals import set_llm_cache
+from langchain_community.llms import Ollama
+
+from llm_cache import CacheMissError, ResponseCache, llm_identity
+
+PROMPT = "Instructions\n\nThe recorded answer. Filler text.\n\nQuestion: q"
+
+
+@pytest.fixture(autouse=True)
+def reset_global_cache():
+    yield
+    set_llm_cache(None)
+
+
+def install_cache(path, mode, llm):
+    cache = ResponseCache(str(path), mode=mode, namespace=llm_identity(llm))
+    set_llm_cache(cache)
+    return cache
+
+
+def record(path, llm):
+    install_cache(path, "record", llm)
+    return llm.invoke(PROMPT)
+
+
+def test_replay_serves_recorded_answer(tmp_path, fake_ollama):
+    llm = Ollama(model="fake", base_url=fake_ollama)
+    answer = record(tmp_path / "cache.sqlite", llm)
+
+    cache = install_cache(tmp_path / "cache.sqlite", "replay", llm)
+
+    assert llm.invoke(PROMPT) == answer == "The recorded answer."
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_replay_of_unrecorded_prompt_raises(tmp_path, fake_ollama):
+    llm = Ollama(model="fake", base_url=fake_ollama)
+    install_cache(tmp_path / "cache.sqlite", "replay", llm)
+
+    with pytest.raises(CacheMissError):
+        llm.invoke(PROMPT)
+
+
+@pytest.mark.parametrize("changed", [{"model": "mistral"}, {"temperature": 0.9},
+                                     {"base_url": "http://127.0.0.1:11434"}])
+def test_answers_are_keyed_by_model_and_parameters(tmp_path, fake_ollama, changed):
+    record(tmp_path / "cache.sqlite", Ollama(model="fake", base_url=fake_ollama))
+
+    other = Ollama(**{"model": "fake", "base_url": fake_ollama, **changed})
+    install_cache(tmp_path / "cache.sqlite", "replay", other)
+
+    with pytest.raises(CacheMissError):
+        other.invoke(PROMPT)
+
+
+def test_rows_record_which_model_answered(tmp_path, fake_ollama):
+    record(tmp_path / "cache.sqlite", Ollama(model="fake", base_url=fake_ollama))
+
+    (llm_string,), = sqlite3.connect(tmp_path / "cache.sqlite").execute("SELECT llm_string FROM responses")
+    assert '"model": "fake"' in llm_string and fake_ollama in llm_string
+
+
+def test_passthrough_neither_reads_nor_writes(tmp_path, fake_ollama):
+    llm = Ollama(model="fake", base_url=fake_ollama)
+    cache = install_cache(tmp_path / "cache.sqlite", "passthrough", llm)
+
+    assert llm.invoke(PROMPT) == "The recorded answer."
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert sqlite3.connect(tmp_path / "cache.sqlite").execute("SELECT COUNT(*) FROM responses").fetchone() == (0,)